@@ -2,7 +2,7 @@
 import React, { useState, useEffect } from 'react';
 import { useRouter, useSearchParams } from 'next/navigation';
 import Link from 'next/link';
-import { setGuestMode } from '@/services/localStorageService';
+import { isGuestMode, pushGuestTodos, setGuestMode } from '@/services/localStorageService';
 
 const API_URL = 'http://localhost:8000';
 
@@ -12,9 +12,52 @@ export default function Login() {
   const [rememberMe, setRememberMe] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
+  // 登录成功但游客数据上传失败：保留本地数据，等待用户重试或明确放弃
+  const [guestSyncFailed, setGuestSyncFailed] = useState(false);
   const router = useRouter();
   const searchParams = useSearchParams();
 
+  const finishLogin = () => {
+    // 退出游客模式会清除本地数据，只能在上传成功或用户放弃之后调用
+    setGuestMode(false);
+    // 获取来源页面，如果没有则默认跳转到首页
+    const from = searchParams.get('from') || '/';
+    router.push(from);
+  };
+
+  // 游客模式下添加的待办事项在登录后上传到账户中，返回是否可以继续
+  const syncGuestTodos = async (): Promise<boolean> => {
+    if (!isGuestMode()) return true;
+    try {
+      await pushGuestTodos();
+      setGuestSyncFailed(false);
+      return true;
+    } catch (err) {
+      console.error('上传游客数据失败:', err);
+      setGuestSyncFailed(true);
+      setError('登录成功，但上传游客模式下的待办事项失败，本地数据已保留。请重试上传，或放弃本地数据继续。');
+      return false;
+    }
+  };
+
+  const handleRetrySync = async () => {
+    setError(null);
+    setLoading(true);
+    try {
+      if (await syncGuestTodos()) {
+        finishLogin();
+      }
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  const handleDiscardGuestTodos = () => {
+    if (window.confirm('确定放弃游客模式下的待办事项吗？本地数据将被删除且无法恢复。')) {
+      finishLogin();
+    }
+  };
+
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
     setError(null);
@@ -39,10 +82,9 @@ export default function Login() {
         throw new Error(data.detail || '登录失败');
       }
 
-      setGuestMode(false);
-      // 获取来源页面，如果没有则默认跳转到首页
-      const from = searchParams.get('from') || '/';
-      router.push(from);
+      if (await syncGuestTodos()) {
+        finishLogin();
+      }
     } catch (err) {
       setError(err instanceof Error ? err.message : '登录失败');
     } finally {
@@ -127,6 +169,27 @@ export default function Login() {
             <div className="text-red-500 text-sm text-center">{error}</div>
           )}
 
+          {guestSyncFailed && (
+            <div className="flex space-x-3">
+              <button
+                type="button"
+                onClick={handleRetrySync}
+                disabled={loading}
+                className="flex-1 py-2 px-4 border border-transparent text-sm font-medium rounded-md text-white bg-blue-600 hover:bg-blue-700 disabled:bg-blue-400"
+              >
+                重试上传
+              </button>
+              <button
+                type="button"
+                onClick={handleDiscardGuestTodos}
+                disabled={loading}
+                className="flex-1 py-2 px-4 border border-gray-300 text-sm font-medium rounded-md text-red-600 bg-white hover:bg-gray-50"
+              >
+                放弃本地数据
+              </button>
+            </div>
+          )}
+
           <div className="space-y-3">
             <button
               type="submit"
@@ -1,5 +1,5 @@
 'use client';
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { format } from 'date-fns';
 import { TodoItem, ModelStats, TodoStep } from '@/types';
 import * as localStorageService from '@/services/localStorageService';
@@ -15,6 +15,8 @@ export default function Todo() {
   const [showDetails, setShowDetails] = useState<number | null>(null);
   const [error, setError] = useState<string | null>(null);
   const [isGuest, setIsGuest] = useState(false);
+  // 增量同步游标，来自列表接口的 X-Sync-Cursor 响应头或上一次同步的结果
+  const syncCursor = useRef<string | null>(null);
 
   // 检查是否为游客模式
   useEffect(() => {
@@ -32,6 +34,18 @@ export default function Todo() {
     }
   }, []);
 
+  // 登录用户订阅服务器推送：其他页面的修改、AI补充完成或模型重新训练后增量更新
+  useEffect(() => {
+    if (localStorageService.isGuestMode()) return;
+    const events = new EventSource(`${API_URL}/todos/events`, { withCredentials: true });
+    // resync 表示推送积压被丢弃，同样通过增量同步补齐
+    ['todo.created', 'todo.updated', 'todo.deleted', 'todo.enriched', 'resync'].forEach(type =>
+      events.addEventListener(type, () => syncChanges())
+    );
+    events.addEventListener('model.retrained', () => fetchModelStats());
+    return () => events.close();
+  }, [isGuest]);
+
   // 保存游客模式的数据
   useEffect(() => {
     if (isGuest) {
@@ -43,26 +57,43 @@ export default function Todo() {
   // 获取所有待办事项
   const fetchTodos = async () => {
     try {
-      const response = await fetch(`${API_URL}/todos/`, {
-        credentials: 'include',
-      });
-      if (response.status === 401) {
-        setError('请先登录');
-        setTodos([]);
-        return;
-      }
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
-      }
-      const data = await response.json();
-      
-      if (!Array.isArray(data)) {
-        console.error('获取到的数据不是数组格式:', data);
-        setTodos([]);
-        return;
-      }
-      
-      setTodos(data);
+      // 后端按游标分页，沿着 X-Next-Cursor 响应头取完所有页
+      const allTodos: TodoItem[] = [];
+      let cursor: string | null = null;
+      let firstPage = true;
+      do {
+        const url: string = cursor
+          ? `${API_URL}/todos/?cursor=${encodeURIComponent(cursor)}`
+          : `${API_URL}/todos/`;
+        const response: Response = await fetch(url, {
+          credentials: 'include',
+        });
+        if (response.status === 401) {
+          setError('请先登录');
+          setTodos([]);
+          return;
+        }
+        if (!response.ok) {
+          throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const data = await response.json();
+
+        if (!Array.isArray(data)) {
+          console.error('获取到的数据不是数组格式:', data);
+          setTodos([]);
+          return;
+        }
+
+        allTodos.push(...data);
+        // 取第一页对应的版本：翻页期间发生的修改会在下次增量同步时补上
+        if (firstPage) {
+          syncCursor.current = response.headers.get('X-Sync-Cursor');
+          firstPage = false;
+        }
+        cursor = response.headers.get('X-Next-Cursor');
+      } while (cursor);
+
+      setTodos(allTodos);
       setError(null);
     } catch (error) {
       console.error('获取待办事项失败:', error);
@@ -73,6 +104,47 @@ export default function Todo() {
     }
   };
 
+  // 只获取上次同步之后新增、修改和删除的待办事项
+  const syncChanges = async () => {
+    if (!syncCursor.current) {
+      return fetchTodos();
+    }
+    try {
+      let hasMore = true;
+      while (hasMore) {
+        const response = await fetch(
+          `${API_URL}/todos/changes?since=${encodeURIComponent(syncCursor.current)}`,
+          { credentials: 'include' }
+        );
+        if (response.status === 401) {
+          setError('请先登录');
+          return;
+        }
+        if (!response.ok) {
+          throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const data = await response.json();
+        // 先删除，再用服务端的最新记录覆盖或追加
+        setTodos(prev => {
+          const deleted = new Set<number>(data.deleted);
+          const changed = new Map<number, TodoItem>(
+            data.todos.map((todo: TodoItem) => [todo.id, todo])
+          );
+          const merged = prev
+            .filter(todo => !deleted.has(todo.id))
+            .map(todo => changed.get(todo.id) ?? todo);
+          const existing = new Set(merged.map(todo => todo.id));
+          return [...merged, ...data.todos.filter((todo: TodoItem) => !existing.has(todo.id))];
+        });
+        syncCursor.current = data.cursor;
+        hasMore = data.has_more;
+      }
+    } catch (error) {
+      console.error('同步待办事项失败:', error);
+      fetchTodos();
+    }
+  };
+
   // 获取模型统计信息
   const fetchModelStats = async () => {
     try {
@@ -147,7 +219,7 @@ export default function Todo() {
           setError('请先登录');
           return;
         }
-        fetchTodos();
+        syncChanges();
       }
     } catch (error) {
       console.error('更新步骤失败:', error);
@@ -183,7 +255,7 @@ export default function Todo() {
           setError('请先登录');
           return;
         }
-        fetchTodos();
+        syncChanges();
         fetchModelStats();
       }
     } catch (error) {
@@ -212,4 +212,40 @@ export const deleteTodo = (id: number): boolean => {
   if (newTodos.length === todos.length) return false;
   saveTodos(newTodos);
   return true;
-}; 
\ No newline at end of file
+}; 
+
+// 登录后把游客的待办事项一次性上传到服务端
+export const pushGuestTodos = async (): Promise<void> => {
+  const todos = getTodos();
+  if (todos.length === 0) return;
+
+  const response = await fetch(`${API_URL}/todos/sync`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    credentials: 'include',
+    body: JSON.stringify({
+      todos: todos.map(todo => ({
+        client_id: todo.id,
+        text: todo.text,
+        completed: todo.completed,
+        category: todo.category,
+        priority: todo.priority,
+        due_date: todo.due_date,
+        created_at: todo.created_at,
+        completed_at: todo.completed_at,
+        estimated_hours: todo.estimated_hours,
+        ai_generated_notes: todo.ai_generated_notes,
+        priority_reasoning: todo.priority_reasoning,
+        actual_completion_time: todo.actual_completion_time,
+        current_step: todo.current_step,
+        steps: todo.steps,
+      })),
+    }),
+  });
+
+  if (!response.ok) {
+    throw new Error('上传游客数据失败');
+  }
+};
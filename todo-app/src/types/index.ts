@@ -19,6 +19,7 @@ export interface TodoItem {
   created_at: string;
   steps?: TodoStep[];
   current_step: number;
+  enrichment_status?: 'pending' | 'done' | 'failed';
 }
 
 export interface ModelStats {
@@ -0,0 +1,86 @@
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# bcrypt 成本因子，修改后旧哈希会在用户下次登录时自动升级
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    # 成本与配置不一致的哈希视为需要升级
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+class HasherBusyError(Exception):
+    """哈希线程池已满，调用方应返回 429"""
+
+class PasswordHasher:
+    """在独立的有界线程池中计算密码哈希，避免登录高峰占满 FastAPI 的默认线程池
+
+    排队中加运行中的任务超过上限时立即拒绝，而不是无限排队。
+    """
+
+    def __init__(self):
+        self.workers = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+        # 除正在计算的任务外，最多允许排队的任务数
+        self.max_queue = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._rejected = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="password-hash"
+            )
+        return self._executor
+
+    async def _submit(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise HasherBusyError("密码哈希队列已满")
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """校验密码；成本因子变化时返回新的哈希，否则第二项为 None"""
+        return await self._submit(pwd_context.verify_and_update, password, hashed)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "rejected": self._rejected,
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+        }
+
+# 创建全局密码哈希实例
+password_hasher = PasswordHasher()
@@ -0,0 +1,103 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+from sqlalchemy import event, inspect
+from models.user import User
+
+logger = logging.getLogger(__name__)
+
+class UserCache:
+    """已认证用户的解析缓存：令牌 -> 用户身份（id、用户名、是否启用、是否游客）
+
+    缓存命中时不需要解码JWT，也不需要查询 users 表。条目在令牌过期、
+    TTL 到期、登出、修改密码或禁用用户时失效。
+    """
+
+    def __init__(self):
+        self.max_entries = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+        self.ttl = float(os.getenv("AUTH_CACHE_TTL", "300"))
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        # user_id -> 该用户已缓存的令牌，用于按用户失效
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, identity = entry
+            if expires_at <= time.time():
+                self._remove(token)
+                return None
+            self._entries.move_to_end(token)
+            return identity
+
+    def set(self, token: str, identity: Any, token_exp: Optional[float] = None) -> None:
+        """缓存解析结果，有效期不超过令牌本身的过期时间"""
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        with self._lock:
+            self._remove(token)
+            self._entries[token] = (expires_at, identity)
+            self._tokens_by_user.setdefault(identity.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def invalidate_token(self, token: str) -> None:
+        with self._lock:
+            self._remove(token)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+        logger.info(f"清除用户认证缓存: user_id={user_id}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def _remove(self, token: str) -> None:
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        user_id = entry[1].id
+        tokens = self._tokens_by_user.get(user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "users": len(self._tokens_by_user),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+            }
+
+# 创建全局用户缓存实例
+user_cache = UserCache()
+
+# 修改密码、禁用用户或改名后立即失效该用户的所有缓存令牌
+_INVALIDATING_FIELDS = ("hashed_password", "is_active", "username", "is_guest")
+
+@event.listens_for(User, "after_update")
+def _invalidate_on_update(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in _INVALIDATING_FIELDS):
+        user_cache.invalidate_user(target.id)
+
+@event.listens_for(User, "after_delete")
+def _invalidate_on_delete(mapper, connection, target):
+    user_cache.invalidate_user(target.id)
@@ -1,11 +1,14 @@
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
-from database.database import get_db
+from fastapi import Depends, HTTPException, status, Request, Response
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.database import get_async_db
 from models.user import User
+from auth.user_cache import user_cache
 import os
 from dotenv import load_dotenv
 from fastapi.security import OAuth2PasswordBearer
@@ -14,25 +17,20 @@ import logging
 
 load_dotenv()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # 移除OAuth2PasswordBearer因为我们使用cookie
 # oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key")  # 添加默认值
 ALGORITHM = os.getenv("ALGORITHM", "HS256")  # 添加默认值
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))  # 添加默认值
+# 游客令牌有效期（天），保存在 guest_token cookie 中
+GUEST_TOKEN_EXPIRE_DAYS = int(os.getenv("GUEST_TOKEN_EXPIRE_DAYS", "365"))
+GUEST_TOKEN_COOKIE = "guest_token"
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
 logger = logging.getLogger(__name__)
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -55,29 +53,86 @@ def get_token_from_cookie(request: Request) -> Optional[str]:
     except:
         return None
 
-def get_guest_user(db: Session) -> User:
-    """获取或创建游客账户"""
-    guest_id = str(uuid.uuid4())
-    guest_user = User(
-        id=guest_id,
-        username=f"guest_{guest_id[:8]}",
-        email=f"guest_{guest_id[:8]}@temp.com",
-        is_guest=True
+@dataclass
+class CurrentUser:
+    """当前请求的用户身份，解析后不再依赖数据库会话
+
+    游客在创建第一条待办事项之前没有 users 表记录，此时 id 为 None。
+    """
+    id: Optional[int]
+    username: str
+    is_active: bool = True
+    is_guest: bool = False
+    guest_id: Optional[str] = None
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            username=user.username,
+            is_active=user.is_active is not False,
+            is_guest=bool(user.is_guest)
+        )
+
+def create_guest_token(guest_id: str, user_id: Optional[int] = None) -> str:
+    """签发游客令牌；游客记录创建后把 user_id 写入令牌"""
+    data = {"guest": guest_id, "type": "guest"}
+    if user_id is not None:
+        data["uid"] = user_id
+    return create_access_token(data, expires_delta=timedelta(days=GUEST_TOKEN_EXPIRE_DAYS))
+
+def set_guest_cookie(response: Response, token: str) -> None:
+    response.set_cookie(
+        key=GUEST_TOKEN_COOKIE,
+        value=token,
+        httponly=True,
+        max_age=GUEST_TOKEN_EXPIRE_DAYS * 24 * 3600,
+        samesite="lax",
+        secure=False  # 开发环境设置为False
     )
-    db.add(guest_user)
-    db.commit()
-    db.refresh(guest_user)
-    logger.info(f"创建游客账户: {guest_user.username}")
-    return guest_user
+
+def get_guest_user(request: Request, response: Response) -> CurrentUser:
+    """从 guest_token cookie 解析游客身份，没有或无效时签发新的游客令牌，不访问数据库"""
+    token = request.cookies.get(GUEST_TOKEN_COOKIE)
+    if token:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            guest_id = payload.get("guest")
+            if payload.get("type") == "guest" and guest_id:
+                return CurrentUser(
+                    id=payload.get("uid"),
+                    username=f"guest_{guest_id}",
+                    is_guest=True,
+                    guest_id=guest_id
+                )
+        except JWTError:
+            pass
+
+    guest_id = uuid.uuid4().hex
+    set_guest_cookie(response, create_guest_token(guest_id))
+    logger.info(f"签发游客令牌: guest_{guest_id[:8]}")
+    return CurrentUser(id=None, username=f"guest_{guest_id}", is_guest=True, guest_id=guest_id)
 
 async def get_current_user(
+    request: Request,
+    response: Response,
     token: Optional[str] = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    """获取当前用户，如果未登录则返回游客账户"""
+    db: AsyncSession = Depends(get_async_db)
+) -> CurrentUser:
+    """获取当前用户，如果未登录则返回游客身份"""
+    token = token or get_token_from_cookie(request)
     if not token:
-        return get_guest_user(db)
+        return get_guest_user(request, response)
         
+    # 缓存命中时跳过JWT解码和用户查询
+    current_user = user_cache.get(token)
+    if current_user is None:
+        current_user = await _resolve_user(token, db)
+    if not current_user.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="用户已被禁用")
+    return current_user
+
+async def _resolve_user(token: str, db: AsyncSession) -> CurrentUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="无效的认证凭据",
@@ -91,10 +146,44 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
         
-    user = db.query(User).filter(User.username == username).first()
+    user = (await db.execute(select(User).where(User.username == username))).scalars().first()
     if user is None:
         raise credentials_exception
-    return user
+    current_user = CurrentUser.from_user(user)
+    user_cache.set(token, current_user, payload.get("exp"))
+    return current_user
+
+async def get_writable_user(
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+) -> CurrentUser:
+    """需要写入数据时使用：游客第一次写入时才创建 users 记录，并把 user_id 写回令牌
+
+    同一游客并发的第一次写入中只有一个能插入成功，其余请求违反用户名唯一约束后回滚并读取已创建的记录。
+    """
+    if current_user.id is not None:
+        return current_user
+
+    guest_user = User(
+        username=current_user.username,
+        email=f"{current_user.username}@temp.com",
+        is_guest=True
+    )
+    db.add(guest_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        guest_user = await db.scalar(select(User).where(User.username == current_user.username))
+        if guest_user is None:
+            raise
+    else:
+        await db.refresh(guest_user)
+        logger.info(f"创建游客账户: {guest_user.username}")
+
+    set_guest_cookie(response, create_guest_token(current_user.guest_id, guest_user.id))
+    return replace(current_user, id=guest_user.id)
 
 # 创建一个可重用的依赖
 get_current_user = get_current_user 
\ No newline at end of file
@@ -1,11 +1,106 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from dotenv import load_dotenv
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./todos.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+load_dotenv()
+
+# 默认使用本地SQLite；设置为 postgresql://... 等地址即可切换到共享数据库
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./todos.db")
+
+# 常见数据库对应的异步驱动，DATABASE_URL 已指定异步驱动时直接使用
+_ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+    "mysql": "aiomysql",
+}
+
+def get_async_url(url: str = SQLALCHEMY_DATABASE_URL) -> str:
+    """把同步数据库地址转换为异步驱动的地址，可用 ASYNC_DATABASE_URL 单独指定"""
+    explicit = os.getenv("ASYNC_DATABASE_URL")
+    if explicit:
+        return explicit
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend in _ASYNC_DRIVERS and parsed.get_driver_name() != _ASYNC_DRIVERS[backend]:
+        parsed = parsed.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}")
+    return parsed.render_as_string(hide_password=False)
+
+def _sqlite_pragmas() -> dict:
+    """每个SQLite连接建立时执行的PRAGMA，可通过环境变量调整"""
+    return {
+        # WAL 模式下读不阻塞写、写不阻塞读
+        "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+        # WAL 下 NORMAL 只在检查点时同步磁盘，断电最多丢失最近的事务但不会损坏数据库
+        "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+        # 负数表示以KB为单位，默认64MB页缓存
+        "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),
+        # 遇到写锁时等待的毫秒数，而不是立即报 database is locked
+        "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    }
+
+def _apply_sqlite_pragmas(sync_engine: Engine, pragmas: dict) -> None:
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def _pool_options() -> dict:
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        # 定期重建连接，避免被数据库或中间代理断开的空闲连接
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+    }
+
+def create_db_engine(url: str = SQLALCHEMY_DATABASE_URL) -> Engine:
+    """根据数据库地址创建引擎：SQLite 在连接时设置PRAGMA，其他数据库配置连接池"""
+    if make_url(url).get_backend_name() == "sqlite":
+        pragmas = _sqlite_pragmas()
+        db_engine = create_engine(
+            url,
+            connect_args={
+                "check_same_thread": False,
+                "timeout": pragmas["busy_timeout"] / 1000,
+            },
+        )
+        _apply_sqlite_pragmas(db_engine, pragmas)
+        return db_engine
+
+    return create_engine(url, **_pool_options())
+
+def create_async_db_engine(url: str = None) -> AsyncEngine:
+    """创建路由使用的异步引擎，连接配置与同步引擎相同"""
+    url = url or get_async_url()
+    if make_url(url).get_backend_name() == "sqlite":
+        pragmas = _sqlite_pragmas()
+        db_engine = create_async_engine(
+            url,
+            connect_args={"timeout": pragmas["busy_timeout"] / 1000},
+        )
+        _apply_sqlite_pragmas(db_engine.sync_engine, pragmas)
+        return db_engine
+
+    return create_async_engine(url, **_pool_options())
+
+# 同步引擎供迁移、后台补充队列和训练子进程使用
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 异步引擎供路由使用，查询期间不阻塞事件循环
+async_engine = create_async_db_engine()
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 # 依赖项
@@ -14,4 +109,8 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,392 @@
+"""数据库结构迁移
+
+已执行的迁移记录在 schema_migrations 表中，启动时按版本号顺序执行尚未执行的迁移，
+每个迁移在独立的事务中完成。新增迁移时在 MIGRATIONS 末尾追加，不要修改已发布的迁移。
+"""
+import re
+import logging
+from datetime import datetime
+from typing import Callable, List, Tuple
+from sqlalchemy import (
+    JSON, Boolean, Column, DateTime, Enum, Float, ForeignKey, Integer, MetaData, String, Table,
+    func, inspect, text
+)
+from sqlalchemy.engine import Connection, Engine
+from database.database import engine
+
+logger = logging.getLogger(__name__)
+
+def _import_models() -> None:
+    # 注册所有模型到 Base.metadata
+    import models.todo  # noqa: F401
+    import models.user  # noqa: F401
+    import models.enrichment  # noqa: F401
+    import models.stats  # noqa: F401
+
+def _add_column(conn: Connection, table: str, column: str, ddl: str) -> None:
+    """列不存在时添加；新建的数据库在 baseline 中已经按模型创建了该列"""
+    existing = {col["name"] for col in inspect(conn).get_columns(table)}
+    if column not in existing:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+def _baseline_tables() -> MetaData:
+    """迁移系统引入时（AI补充队列之后）的表结构快照
+
+    不引用 models/ 中的模型：之后模型的修改都由后续迁移完成，新建数据库和旧数据库经过同样的迁移步骤。
+    """
+    metadata = MetaData()
+    Table(
+        "users", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("username", String, unique=True, index=True),
+        Column("email", String, unique=True, index=True),
+        Column("hashed_password", String),
+        Column("is_active", Boolean),
+        Column("is_guest", Boolean),
+        Column("created_at", DateTime(timezone=True), server_default=func.now()),
+        Column("last_login", DateTime(timezone=True)),
+    )
+    Table(
+        "todos", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("text", String, index=True),
+        Column("completed", Boolean),
+        Column("user_id", Integer, ForeignKey("users.id")),
+        Column("category", String, index=True),
+        Column("priority", Enum("LOW", "MEDIUM", "HIGH", name="priorityenum")),
+        Column("due_date", DateTime),
+        Column("created_at", DateTime),
+        Column("ai_generated_notes", String),
+        Column("estimated_hours", Float),
+        Column("priority_reasoning", String),
+        Column("actual_completion_time", Float),
+        Column("completed_at", DateTime),
+        Column("steps", JSON),
+        Column("current_step", Integer),
+        Column("enrichment_status", String),
+    )
+    Table(
+        "enrichment_jobs", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("todo_id", Integer, ForeignKey("todos.id"), index=True),
+        Column("status", String, index=True),
+        Column("attempts", Integer),
+        Column("keep_category", Boolean),
+        Column("keep_priority", Boolean),
+        Column("claim_token", String),
+        Column("claimed_at", DateTime),
+        Column("last_error", String),
+        Column("created_at", DateTime),
+    )
+    return metadata
+
+def _baseline(conn: Connection) -> None:
+    """建表，并把迁移系统引入之前创建的数据库补齐到当时的结构
+
+    已存在的表不会被修改（create_all 只创建缺少的表），只补充 AI 补充队列引入的 enrichment_status 列。
+    """
+    _baseline_tables().create_all(bind=conn)
+    _add_column(conn, "todos", "enrichment_status", "VARCHAR DEFAULT 'done'")
+
+def _todo_composite_indexes(conn: Connection) -> None:
+    """按实际查询建立 (user_id, ...) 复合索引，删除查询用不到的 text 索引"""
+    conn.execute(text("DROP INDEX IF EXISTS ix_todos_text"))
+    for name, columns in (
+        ("ix_todos_user_completed", "user_id, completed"),
+        ("ix_todos_user_category", "user_id, category"),
+        ("ix_todos_user_priority", "user_id, priority"),
+        ("ix_todos_user_created", "user_id, created_at, id"),
+    ):
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON todos ({columns})"))
+
+def _todo_search_fts(conn: Connection) -> None:
+    """待办事项全文搜索：FTS5 外部内容表 + 触发器同步，trigram 分词支持中文子串匹配
+
+    只用于 SQLite；SQLite 版本过低（< 3.34）或使用其他数据库时跳过，搜索接口退回 LIKE 查询。
+    """
+    if conn.dialect.name != "sqlite":
+        logger.info("非 SQLite 数据库，跳过全文搜索索引")
+        return
+    version = tuple(int(part) for part in conn.dialect.dbapi.sqlite_version.split("."))
+    if version < (3, 34, 0):
+        logger.warning(f"SQLite {conn.dialect.dbapi.sqlite_version} 不支持 trigram 分词，跳过全文搜索索引")
+        return
+
+    conn.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5("
+        "text, ai_generated_notes, category, "
+        "content='todos', content_rowid='id', tokenize='trigram')"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS todos_fts_insert AFTER INSERT ON todos BEGIN "
+        "INSERT INTO todos_fts(rowid, text, ai_generated_notes, category) "
+        "VALUES (new.id, new.text, new.ai_generated_notes, new.category); "
+        "END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS todos_fts_delete AFTER DELETE ON todos BEGIN "
+        "INSERT INTO todos_fts(todos_fts, rowid, text, ai_generated_notes, category) "
+        "VALUES ('delete', old.id, old.text, old.ai_generated_notes, old.category); "
+        "END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS todos_fts_update "
+        "AFTER UPDATE OF text, ai_generated_notes, category ON todos BEGIN "
+        "INSERT INTO todos_fts(todos_fts, rowid, text, ai_generated_notes, category) "
+        "VALUES ('delete', old.id, old.text, old.ai_generated_notes, old.category); "
+        "INSERT INTO todos_fts(rowid, text, ai_generated_notes, category) "
+        "VALUES (new.id, new.text, new.ai_generated_notes, new.category); "
+        "END"
+    ))
+    # 为已有数据建立索引
+    conn.execute(text("INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')"))
+
+def _user_data_version(conn: Connection) -> None:
+    """用户数据版本号，用于列表接口的 ETag 和响应缓存"""
+    _add_column(conn, "users", "data_version", "INTEGER NOT NULL DEFAULT 0")
+
+def _todo_revisions(conn: Connection) -> None:
+    """增量同步：待办事项的修改版本号和删除记录"""
+    from models.todo import TodoTombstone
+
+    _add_column(conn, "todos", "revision", "INTEGER NOT NULL DEFAULT 0")
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_todos_user_revision ON todos (user_id, revision, id)"
+    ))
+    TodoTombstone.__table__.create(conn, checkfirst=True)
+
+def _stats_statements(row: str, sign: str) -> str:
+    """触发器中把 new/old 这一行的贡献加到（sign 为 +）或减出（-）汇总表"""
+    from models.stats import STATS_CONTRIBUTIONS
+
+    columns = ", ".join(STATS_CONTRIBUTIONS)
+    values = ", ".join(f"{sign}({expr.format(row=row)})" for expr in STATS_CONTRIBUTIONS.values())
+    updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in STATS_CONTRIBUTIONS)
+    category = f"coalesce({row}.category, '')"
+    completed = STATS_CONTRIBUTIONS["completed_count"].format(row=row)
+    statements = (
+        f"INSERT INTO user_todo_stats (user_id, {columns}) "
+        f"SELECT {row}.user_id, {values} WHERE {row}.user_id IS NOT NULL "
+        f"ON CONFLICT (user_id) DO UPDATE SET {updates}; "
+        "INSERT INTO user_category_stats (user_id, category, total_count, completed_count) "
+        f"SELECT {row}.user_id, {category}, {sign}1, {sign}({completed}) WHERE {row}.user_id IS NOT NULL "
+        "ON CONFLICT (user_id, category) DO UPDATE SET "
+        "total_count = total_count + excluded.total_count, "
+        "completed_count = completed_count + excluded.completed_count; "
+    )
+    if sign == "-":
+        statements += (
+            "DELETE FROM user_category_stats "
+            f"WHERE user_id = {row}.user_id AND category = {category} AND total_count <= 0; "
+        )
+    return statements
+
+def _user_todo_stats(conn: Connection) -> None:
+    """按用户预先汇总待办事项数量和工时，由 todos 表上的触发器增量维护
+
+    覆盖所有写入路径（包括 executemany 和后台补充队列）。只用于 SQLite，
+    其他数据库下统计接口退回实时聚合查询。同时把 (user_id, completed) 索引扩展到 due_date，用于统计逾期数量。
+    """
+    from models.stats import STATS_CONTRIBUTIONS, UserCategoryStats, UserTodoStats
+
+    UserTodoStats.__table__.create(conn, checkfirst=True)
+    UserCategoryStats.__table__.create(conn, checkfirst=True)
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_todos_user_completed_due ON todos (user_id, completed, due_date)"
+    ))
+    conn.execute(text("DROP INDEX IF EXISTS ix_todos_user_completed"))
+
+    if conn.dialect.name != "sqlite":
+        logger.info("非 SQLite 数据库，跳过统计触发器")
+        return
+
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS todos_stats_insert AFTER INSERT ON todos BEGIN "
+        f"{_stats_statements('new', '+')} END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS todos_stats_delete AFTER DELETE ON todos BEGIN "
+        f"{_stats_statements('old', '-')} END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS todos_stats_update "
+        "AFTER UPDATE OF user_id, completed, category, priority, estimated_hours, actual_completion_time "
+        f"ON todos BEGIN {_stats_statements('old', '-')}{_stats_statements('new', '+')} END"
+    ))
+
+    # 汇总已有数据
+    columns = ", ".join(STATS_CONTRIBUTIONS)
+    sums = ", ".join(f"sum({expr.format(row='todos')})" for expr in STATS_CONTRIBUTIONS.values())
+    completed = STATS_CONTRIBUTIONS["completed_count"].format(row="todos")
+    conn.execute(text("DELETE FROM user_todo_stats"))
+    conn.execute(text("DELETE FROM user_category_stats"))
+    conn.execute(text(
+        f"INSERT INTO user_todo_stats (user_id, {columns}) "
+        f"SELECT user_id, {sums} FROM todos WHERE user_id IS NOT NULL GROUP BY user_id"
+    ))
+    conn.execute(text(
+        "INSERT INTO user_category_stats (user_id, category, total_count, completed_count) "
+        f"SELECT user_id, coalesce(category, ''), count(*), sum({completed}) "
+        "FROM todos WHERE user_id IS NOT NULL GROUP BY user_id, coalesce(category, '')"
+    ))
+
+def _todo_search_bigrams(conn: Connection) -> None:
+    """1-2 个字符的关键词（大部分中文词）使用的二元组全文索引
+
+    trigram 分词不匹配少于3个字符的关键词。新建一个普通 FTS5 表（unicode61 分词），
+    每列以空格分隔的二元组形式写入，由触发器借助 search_positions 序号表生成（触发器中不能使用 WITH）。
+    与迁移 3 相同，只用于支持 trigram 的 SQLite。
+    """
+    from services.search_service import (
+        BIGRAM_TABLE, MAX_BIGRAM_POSITIONS, POSITIONS_TABLE, bigram_expression, search_service
+    )
+
+    if not inspect(conn).has_table("todos_fts"):
+        logger.info("没有全文搜索索引，跳过二元组索引")
+        return
+
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {POSITIONS_TABLE} (n INTEGER PRIMARY KEY)"))
+    conn.execute(text(
+        f"INSERT OR IGNORE INTO {POSITIONS_TABLE} (n) "
+        f"WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < {MAX_BIGRAM_POSITIONS}) "
+        "SELECT n FROM seq"
+    ))
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {BIGRAM_TABLE} USING fts5("
+        "text, ai_generated_notes, category, tokenize='unicode61 remove_diacritics 0')"
+    ))
+
+    def insert(row: str) -> str:
+        return (
+            f"INSERT INTO {BIGRAM_TABLE}(rowid, text, ai_generated_notes, category) VALUES ("
+            f"{row}.id, {bigram_expression(f'{row}.text')}, "
+            f"{bigram_expression(f'{row}.ai_generated_notes')}, {bigram_expression(f'{row}.category')}); "
+        )
+
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {BIGRAM_TABLE}_insert AFTER INSERT ON todos BEGIN {insert('new')} END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {BIGRAM_TABLE}_delete AFTER DELETE ON todos BEGIN "
+        f"DELETE FROM {BIGRAM_TABLE} WHERE rowid = old.id; END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {BIGRAM_TABLE}_update "
+        "AFTER UPDATE OF text, ai_generated_notes, category ON todos BEGIN "
+        f"DELETE FROM {BIGRAM_TABLE} WHERE rowid = old.id; {insert('new')} END"
+    ))
+    # 为已有数据建立索引
+    conn.execute(text(search_service.bigram_backfill_sql()))
+
+def _set_not_null(conn: Connection, table: str, column: str, column_type: str, default: str) -> None:
+    """把已有数据库中可为空的列回填默认值并改为 NOT NULL DEFAULT
+
+    SQLite 不能修改列定义，按官方文档的步骤重建表：用改好列定义的建表语句创建新表、复制数据、
+    删除旧表后改名，再重新创建旧表上的索引和触发器。连接没有开启 foreign_keys，删除旧表不会检查外键。
+    """
+    conn.execute(text(f"UPDATE {table} SET {column} = {default} WHERE {column} IS NULL"))
+    if conn.dialect.name != "sqlite":
+        conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT {default}"))
+        conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL"))
+        return
+
+    columns = {row[1]: row for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+    # table_info 的第4列是 notnull
+    if columns[column][3]:
+        return
+    table_sql = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :t"), {"t": table}
+    ).scalar_one()
+    new_sql, replaced = re.subn(
+        rf"\b{column}\s+{column_type}(?=\s*[,)])",
+        f"{column} {column_type} NOT NULL DEFAULT {default}",
+        table_sql,
+        count=1
+    )
+    if not replaced:
+        raise RuntimeError(f"无法修改列定义: {table}.{column}")
+    rebuilt = f"{table}_rebuild"
+    new_sql = re.sub(rf"^CREATE TABLE\s+\"?{table}\"?", f"CREATE TABLE {rebuilt}", new_sql, count=1)
+    dependents = [
+        row[0] for row in conn.execute(text(
+            "SELECT sql FROM sqlite_master "
+            "WHERE tbl_name = :t AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+        ), {"t": table})
+    ]
+
+    conn.execute(text(new_sql))
+    conn.execute(text(f"INSERT INTO {rebuilt} SELECT * FROM {table}"))
+    conn.execute(text(f"DROP TABLE {table}"))
+    conn.execute(text(f"ALTER TABLE {rebuilt} RENAME TO {table}"))
+    for sql in dependents:
+        conn.execute(text(sql))
+
+def _user_data_version_not_null(conn: Connection) -> None:
+    """早期的 baseline 迁移按模型为已有数据库补列时没有带上 NOT NULL DEFAULT，
+    迁移 4 随后跳过了已存在的列，data_version 为空时 ETag 永远不变。回填为 0 并加上约束。
+    """
+    _set_not_null(conn, "users", "data_version", "INTEGER", "0")
+
+def _todo_revision_not_null(conn: Connection) -> None:
+    """与迁移 8 相同的原因，已有数据库的 todos.revision 可能为空，列表接口和批量新建都依赖它"""
+    _set_not_null(conn, "todos", "revision", "INTEGER", "0")
+
+def _tombstone_retention(conn: Connection) -> None:
+    """删除记录只保留一段时间，清理后用 pruned_revision 判断同步游标是否过期"""
+    _add_column(conn, "users", "pruned_revision", "INTEGER NOT NULL DEFAULT 0")
+
+def _enrichment_retry_backoff(conn: Connection) -> None:
+    """补充任务失败后退避重试，LLM 故障期间不会在几秒内用完所有重试次数"""
+    _add_column(conn, "enrichment_jobs", "next_attempt_at", DateTime().compile(dialect=conn.dialect))
+
+# (版本号, 名称, 迁移函数)
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "baseline", _baseline),
+    (2, "todo_composite_indexes", _todo_composite_indexes),
+    (3, "todo_search_fts", _todo_search_fts),
+    (4, "user_data_version", _user_data_version),
+    (5, "todo_revisions", _todo_revisions),
+    (6, "user_todo_stats", _user_todo_stats),
+    (7, "todo_search_bigrams", _todo_search_bigrams),
+    (8, "user_data_version_not_null", _user_data_version_not_null),
+    (9, "todo_revision_not_null", _todo_revision_not_null),
+    (10, "tombstone_retention", _tombstone_retention),
+    (11, "enrichment_retry_backoff", _enrichment_retry_backoff),
+]
+
+def _ensure_migrations_table(conn: Connection) -> None:
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, "
+        "name VARCHAR NOT NULL, "
+        "applied_at TIMESTAMP NOT NULL)"
+    ))
+
+def applied_versions(bind: Engine = engine) -> List[int]:
+    with bind.begin() as conn:
+        _ensure_migrations_table(conn)
+        rows = conn.execute(text("SELECT version FROM schema_migrations ORDER BY version"))
+        return [row[0] for row in rows]
+
+def run_migrations(bind: Engine = engine) -> List[int]:
+    """执行所有未执行的迁移，返回本次执行的版本号"""
+    _import_models()
+    done = set(applied_versions(bind))
+    executed = []
+    for version, name, migrate in MIGRATIONS:
+        if version in done:
+            continue
+        with bind.begin() as conn:
+            migrate(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)"),
+                {"v": version, "n": name, "t": datetime.utcnow()}
+            )
+        executed.append(version)
+        logger.info(f"执行数据库迁移: {version} {name}")
+    return executed
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    executed = run_migrations()
+    print(f"已执行迁移: {executed}" if executed else "数据库已是最新结构")
@@ -1,12 +1,53 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import text
 from routers import todo, auth
-from database.database import engine
-from models.todo import Base as TodoBase
-from models.user import Base as UserBase
+from database.database import engine, async_engine
+from database.migrations import run_migrations
+from services.llm_client import llm_client
+from services.enrichment_service import enrichment_worker
+from services.suggestion_cache import suggestion_cache
+from services.training_scheduler import training_scheduler
+from services.model_registry import model_registry
+from auth.user_cache import user_cache
+from auth.hashing import password_hasher
+from services.response_cache import response_cache
+from services.event_hub import event_hub
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# 启动阶段状态，供 /readyz 使用
+startup_state = {"database": False}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    await asyncio.to_thread(run_migrations)
+    startup_state["database"] = True
+    logger.info(f"数据库迁移完成: {time.perf_counter() - started:.3f}s")
+
+    await event_hub.start()
+    # 启动AI补充队列，继续处理重启前未完成的任务
+    await enrichment_worker.start()
+    # 模型在后台加载，不阻塞端口监听；加载完成前 /readyz 返回 503
+    warm_up = asyncio.create_task(asyncio.to_thread(model_registry.warm_up))
+    logger.info(f"应用启动完成: {time.perf_counter() - started:.3f}s")
+    yield
+    await warm_up
+    await enrichment_worker.stop()
+    await asyncio.to_thread(training_scheduler.shutdown)
+    await event_hub.stop()
+    password_hasher.shutdown()
+    # 关闭共享的LLM连接池
+    await llm_client.aclose()
+    await async_engine.dispose()
 
 # 创建 FastAPI 应用
-app = FastAPI(title="Todo API")
+app = FastAPI(title="Todo API", lifespan=lifespan)
 
 # 配置 CORS
 app.add_middleware(
@@ -15,18 +56,71 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["*"],
+    # 携带凭据的跨域请求不支持通配符，需要显式列出前端读取的响应头
+    expose_headers=["*", "X-Next-Cursor", "X-Next-Offset", "X-Sync-Cursor", "ETag"],
     max_age=3600,  # 预检请求的缓存时间
 )
 
-# 创建数据库表
-TodoBase.metadata.create_all(bind=engine)
-UserBase.metadata.create_all(bind=engine)
-
 # 包含路由
 app.include_router(auth.router)
 app.include_router(todo.router)
 
+@app.get("/healthz")
+def healthz():
+    """存活检查：进程能处理请求即返回成功"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz(response: Response):
+    """就绪检查：数据库可用且模型已加载"""
+    checks = {
+        "database": startup_state["database"] and _database_available(),
+        "models": model_registry.ready,
+    }
+    ready = all(checks.values())
+    if not ready:
+        response.status_code = 503
+    return {"status": "ready" if ready else "not_ready", "checks": checks}
+
+def _database_available() -> bool:
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return True
+    except Exception as e:
+        logger.error(f"数据库检查失败: {str(e)}")
+        return False
+
+@app.get("/metrics/suggestion-cache")
+def get_suggestion_cache_stats():
+    """AI建议缓存的命中/未命中/淘汰计数，用于评估缓存容量"""
+    return suggestion_cache.stats()
+
+@app.get("/metrics/model-registry")
+def get_model_registry_stats():
+    """内存中已加载的个人模型数量和大小"""
+    return model_registry.stats()
+
+@app.get("/metrics/auth-cache")
+def get_auth_cache_stats():
+    """已认证用户解析缓存的大小"""
+    return user_cache.stats()
+
+@app.get("/metrics/password-hasher")
+def get_password_hasher_stats():
+    """密码哈希线程池的排队和拒绝计数"""
+    return password_hasher.stats()
+
+@app.get("/metrics/response-cache")
+def get_response_cache_stats():
+    """列表接口响应缓存的命中/未命中计数和 304 次数"""
+    return response_cache.stats()
+
+@app.get("/metrics/events")
+def get_event_hub_stats():
+    """事件流的连接数和发布/投递/溢出计数"""
+    return event_hub.stats()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime
+from database.database import Base
+from datetime import datetime
+
+class EnrichmentJob(Base):
+    """待执行的AI补充任务，持久化保存以便重启后继续处理"""
+    __tablename__ = "enrichment_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    todo_id = Column(Integer, ForeignKey("todos.id"), index=True)
+    status = Column(String, default="pending", index=True)  # pending / running
+    attempts = Column(Integer, default=0)
+    keep_category = Column(Boolean, default=False)  # 用户已指定分类，不覆盖
+    keep_priority = Column(Boolean, default=False)  # 用户已指定优先级，不覆盖
+    claim_token = Column(String, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+    last_error = Column(String, nullable=True)
+    next_attempt_at = Column(DateTime, nullable=True)  # 失败后按指数退避等待，到达该时间前不会被领取
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,43 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from database.database import Base
+
+# 一行待办事项对 user_todo_stats 各列的贡献（SQL 表达式），{row} 为触发器中的 new/old 或表名 todos。
+# 迁移中的触发器和非 SQLite 数据库下的实时聚合查询共用这些表达式
+_TRACKED = "{row}.completed AND {row}.actual_completion_time IS NOT NULL"
+_PRIORITY = "CASE WHEN upper(CAST({{row}}.priority AS VARCHAR)) = '{name}' THEN 1 ELSE 0 END"
+STATS_CONTRIBUTIONS = {
+    "total_count": "1",
+    "completed_count": "CASE WHEN {row}.completed THEN 1 ELSE 0 END",
+    "high_count": _PRIORITY.format(name="HIGH"),
+    "medium_count": _PRIORITY.format(name="MEDIUM"),
+    "low_count": _PRIORITY.format(name="LOW"),
+    "estimated_hours": "coalesce({row}.estimated_hours, 0)",
+    "tracked_count": f"CASE WHEN {_TRACKED} THEN 1 ELSE 0 END",
+    "tracked_estimated_hours": f"CASE WHEN {_TRACKED} THEN coalesce({{row}}.estimated_hours, 0) ELSE 0 END",
+    "tracked_actual_hours": f"CASE WHEN {_TRACKED} THEN {{row}}.actual_completion_time ELSE 0 END",
+}
+
+class UserTodoStats(Base):
+    """每个用户一行的待办事项汇总，由 todos 表上的触发器增量维护（见迁移 6）"""
+    __tablename__ = "user_todo_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_count = Column(Integer, nullable=False, default=0, server_default="0")
+    completed_count = Column(Integer, nullable=False, default=0, server_default="0")
+    high_count = Column(Integer, nullable=False, default=0, server_default="0")
+    medium_count = Column(Integer, nullable=False, default=0, server_default="0")
+    low_count = Column(Integer, nullable=False, default=0, server_default="0")
+    estimated_hours = Column(Float, nullable=False, default=0, server_default="0")
+    # 已完成且记录了实际用时的待办事项，用于比较预估工时和实际用时
+    tracked_count = Column(Integer, nullable=False, default=0, server_default="0")
+    tracked_estimated_hours = Column(Float, nullable=False, default=0, server_default="0")
+    tracked_actual_hours = Column(Float, nullable=False, default=0, server_default="0")
+
+class UserCategoryStats(Base):
+    """按分类的待办事项数量，total 为 0 的分类不再返回"""
+    __tablename__ = "user_category_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    category = Column(String, primary_key=True)
+    total_count = Column(Integer, nullable=False, default=0, server_default="0")
+    completed_count = Column(Integer, nullable=False, default=0, server_default="0")
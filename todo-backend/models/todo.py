@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Enum, Float, JSON
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Enum, Float, JSON, Index
 from sqlalchemy.orm import relationship
 from database.database import Base
 import enum
@@ -11,9 +11,17 @@ class PriorityEnum(str, enum.Enum):
 
 class TodoModel(Base):
     __tablename__ = "todos"
+    # 所有查询都先按 user_id 过滤，索引与 database/migrations.py 中的迁移保持一致
+    __table_args__ = (
+        Index("ix_todos_user_completed_due", "user_id", "completed", "due_date"),
+        Index("ix_todos_user_category", "user_id", "category"),
+        Index("ix_todos_user_priority", "user_id", "priority"),
+        Index("ix_todos_user_created", "user_id", "created_at", "id"),
+        Index("ix_todos_user_revision", "user_id", "revision", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    text = Column(String, index=True)
+    text = Column(String)
     completed = Column(Boolean, default=False)
     user_id = Column(Integer, ForeignKey("users.id"))
     category = Column(String, index=True)
@@ -27,5 +35,20 @@ class TodoModel(Base):
     completed_at = Column(DateTime, nullable=True)
     steps = Column(JSON, nullable=True)  # 存储任务步骤
     current_step = Column(Integer, default=0)  # 当前完成到哪个步骤
+    enrichment_status = Column(String, default="done")  # AI补充状态: pending / done / failed
+    revision = Column(Integer, nullable=False, default=0, server_default="0")  # 最后一次修改时用户的 data_version
 
-    user = relationship("User", back_populates="todos") 
\ No newline at end of file
+    user = relationship("User", back_populates="todos")
+
+class TodoTombstone(Base):
+    """已删除待办事项的记录，供增量同步通知客户端删除"""
+    __tablename__ = "todo_tombstones"
+    __table_args__ = (
+        Index("ix_todo_tombstones_user_revision", "user_id", "revision"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    todo_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    revision = Column(Integer, nullable=False)  # 删除时用户的 data_version
+    deleted_at = Column(DateTime, default=datetime.utcnow)
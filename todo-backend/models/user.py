@@ -14,5 +14,9 @@ class User(Base):
     is_guest = Column(Boolean, default=False)  # 标记是否为游客账户
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     last_login = Column(DateTime(timezone=True), nullable=True)
+    # 每次写入该用户的待办事项时加一，用于生成 ETag
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # 已清理的删除记录中最大的 revision，早于它的同步游标需要全量重新同步
+    pruned_revision = Column(Integer, nullable=False, default=0, server_default="0")
 
     todos = relationship("TodoModel", back_populates="user") 
\ No newline at end of file
@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
-from database.database import get_db
+from database.database import get_async_db
 from models.user import User
-from auth.utils import verify_password, get_password_hash, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from auth.utils import (
+    create_access_token, get_token_from_cookie, oauth2_scheme, ACCESS_TOKEN_EXPIRE_MINUTES
+)
+from auth.hashing import password_hasher, HasherBusyError
+from auth.user_cache import user_cache
+from typing import Optional
 from pydantic import BaseModel
 
 router = APIRouter(
@@ -26,21 +32,32 @@ class Token(BaseModel):
     access_token: str
     token_type: str
 
+def _busy_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="请求过多，请稍后重试",
+        headers={"Retry-After": "1"}
+    )
+
 @router.post("/register", response_model=Token)
-def register(user: UserCreate, response: Response, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.username == user.username).first()
-    if db_user:
+async def register(user: UserCreate, response: Response, db: AsyncSession = Depends(get_async_db)):
+    # 一次查询同时检查用户名和邮箱
+    existing = (await db.execute(select(User.username, User.email).where(
+        or_(User.username == user.username, User.email == user.email)
+    ).limit(2))).all()
+    if any(row.username == user.username for row in existing):
         raise HTTPException(status_code=400, detail="用户名已存在")
-    
-    db_user = db.query(User).filter(User.email == user.email).first()
-    if db_user:
+    if existing:
         raise HTTPException(status_code=400, detail="邮箱已被注册")
     
-    hashed_password = get_password_hash(user.password)
+    try:
+        hashed_password = await password_hasher.hash(user.password)
+    except HasherBusyError:
+        raise _busy_exception()
     db_user = User(username=user.username, email=user.email, hashed_password=hashed_password)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -60,14 +77,27 @@ def register(user: UserCreate, response: Response, db: Session = Depends(get_db)
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/login", response_model=Token)
-def login(user: UserLogin, response: Response, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.username == user.username).first()
-    if not db_user or not verify_password(user.password, db_user.hashed_password):
+async def login(user: UserLogin, response: Response, db: AsyncSession = Depends(get_async_db)):
+    db_user = (await db.execute(select(User).where(User.username == user.username))).scalars().first()
+    verified, new_hash = False, None
+    if db_user and db_user.hashed_password:
+        try:
+            verified, new_hash = await password_hasher.verify_and_update(
+                user.password, db_user.hashed_password
+            )
+        except HasherBusyError:
+            raise _busy_exception()
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户名或密码错误"
         )
     
+    # 成本因子调整后，用本次登录的明文密码重新生成哈希
+    if new_hash:
+        db_user.hashed_password = new_hash
+        await db.commit()
+    
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
@@ -86,6 +116,14 @@ def login(user: UserLogin, response: Response, db: Session = Depends(get_db)):
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/logout")
-def logout(response: Response):
+def logout(
+    request: Request,
+    response: Response,
+    token: Optional[str] = Depends(oauth2_scheme)
+):
+    # 登出后该令牌不再从缓存中解析
+    for t in {token, get_token_from_cookie(request)}:
+        if t:
+            user_cache.invalidate_token(t)
     response.delete_cookie("access_token")
     return {"message": "已成功登出"} 
\ No newline at end of file
@@ -1,15 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from database.database import get_db
-from models.todo import TodoModel
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import and_, delete, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from database.database import get_async_db
+from models.todo import TodoModel, TodoTombstone, PriorityEnum
 from models.user import User
-from schemas.todo import Todo, TodoCreate, TodoUpdate, TodoAnalysis, TodoResponse, TodoStep
-from auth.utils import get_current_user
+from models.enrichment import EnrichmentJob
+from models.stats import STATS_CONTRIBUTIONS
+from schemas.todo import (
+    Todo, TodoCreate, TodoUpdate, TodoAnalysis, TodoResponse, TodoStep,
+    PriorityPredictionRequest, PriorityPrediction,
+    BulkTodoUpdate, BulkDeleteRequest, BulkItemResult,
+    TodoChanges, TodoSyncRequest, TodoSyncResponse, TodoStats,
+    TodoImportItem, TodoImportResult, TodoImportError
+)
+from auth.utils import CurrentUser, get_current_user, get_writable_user
 from services.ai_service import generate_todo_suggestions
-from services.ml_service import ml_service
+from services.model_registry import model_registry
+from services.enrichment_service import enrichment_worker
+from services.training_scheduler import training_scheduler
+from services.search_service import search_service
+from services.event_hub import event_hub
+from services.stats_service import stats_service
+from services.transfer_service import transfer_service, FORMATS, MEDIA_TYPES
+from services.response_cache import (
+    CACHE_CONTROL, bump_data_version, etag_matches, get_data_version, response_cache
+)
+import os
+import base64
+import asyncio
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
+from itertools import islice
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -20,44 +46,345 @@ router = APIRouter(
     tags=["todos"]
 )
 
-def train_ml_model(db: Session, user_id: int):
-    """后台训练机器学习模型"""
-    todos = db.query(TodoModel).filter(
+# 单次批量预测的最大条数
+MAX_PREDICTION_BATCH = 1000
+
+# 单次批量创建/更新/删除的最大条数
+MAX_BULK_ITEMS = 500
+
+# GET /todos/ 每页默认条数和上限
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+# 下一页游标通过响应头返回，响应体保持数组格式
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# 搜索结果按相关度排序，使用 offset 分页
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+NEXT_OFFSET_HEADER = "X-Next-Offset"
+# 列表接口同时返回对应数据版本的同步游标，之后可以用 GET /todos/changes 增量更新
+SYNC_CURSOR_HEADER = "X-Sync-Cursor"
+# 删除记录的保留天数，早于保留期的同步游标返回 410，客户端需要不带 since 重新全量同步
+TOMBSTONE_RETENTION_DAYS = float(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+# 导入结果中最多返回的错误条数
+MAX_IMPORT_ERRORS = 100
+# 列表接口可返回的字段，fields= 只能从中选择
+TODO_LIST_FIELDS = tuple(Todo.model_fields)
+
+def _default_steps() -> List[TodoStep]:
+    return [
+        TodoStep(description=step, order=idx+1, completed=False)
+        for idx, step in enumerate([
+            "分析任务需求",
+            "制定执行计划",
+            "执行任务",
+            "检查完成情况"
+        ])
+    ]
+
+def _build_todo_response(todo: TodoModel) -> TodoResponse:
+    """根据数据库记录构建响应"""
+    todo_analysis = TodoAnalysis(
+        category=todo.category or "未分类",
+        priority=todo.priority,
+        estimated_hours=todo.estimated_hours or 1.0,
+        ai_notes=todo.ai_generated_notes or "无建议",
+        priority_reasoning=todo.priority_reasoning or "无详细原因",
+        steps=_default_steps()
+    )
+    return TodoResponse(
+        id=todo.id,
+        text=todo.text,
+        completed=todo.completed,
+        created_at=todo.created_at,
+        due_date=todo.due_date,
+        category=todo_analysis.category,
+        priority=todo.priority,
+        estimated_hours=todo_analysis.estimated_hours,
+        ai_generated_notes=todo.ai_generated_notes,
+        priority_reasoning=todo.priority_reasoning,
+        actual_completion_time=todo.actual_completion_time,
+        completed_at=todo.completed_at,
+        steps=todo_analysis.steps,
+        analysis=todo_analysis,
+        enrichment_status=todo.enrichment_status
+    )
+
+async def _get_user_todo(db: AsyncSession, todo_id: int, current_user: CurrentUser) -> Optional[TodoModel]:
+    if current_user.id is None:
+        return None
+    result = await db.execute(select(TodoModel).where(
+        TodoModel.id == todo_id,
+        TodoModel.user_id == current_user.id
+    ))
+    return result.scalars().first()
+
+def _encode_cursor(created_at: datetime, todo_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{todo_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, todo_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(todo_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+
+def _encode_sync_cursor(revision: int, todo_id: Optional[int] = None) -> str:
+    raw = str(revision) if todo_id is None else f"{revision}|{todo_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_sync_cursor(cursor: str) -> Tuple[int, Optional[int]]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        revision, _, todo_id = raw.partition("|")
+        return int(revision), int(todo_id) if todo_id else None
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="无效的同步游标")
+
+async def _check_sync_cursor(db: AsyncSession, user_id: int, since_revision: int) -> None:
+    """游标之后的删除记录已被清理时，增量结果会漏掉删除，要求客户端全量重新同步"""
+    pruned = await db.scalar(select(User.pruned_revision).where(User.id == user_id))
+    if pruned and since_revision < pruned:
+        raise HTTPException(status_code=410, detail="同步游标已过期，请不带 since 重新全量同步")
+
+async def _prune_tombstones(db: AsyncSession, user_id: int) -> None:
+    """删除该用户超过保留期的删除记录，并记下其中最大的 revision，在删除待办事项的事务中调用"""
+    expired = and_(
+        TodoTombstone.user_id == user_id,
+        TodoTombstone.deleted_at < datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    )
+    pruned = await db.scalar(
+        select(TodoTombstone.revision).where(expired).order_by(TodoTombstone.revision.desc()).limit(1)
+    )
+    if pruned is None:
+        return
+    await db.execute(delete(TodoTombstone).where(expired))
+    await db.execute(update(User).where(User.id == user_id).values(pruned_revision=pruned))
+
+async def _next_revision(db: AsyncSession, user_id: int) -> int:
+    """增加用户的数据版本，返回值作为本次写入的 revision"""
+    return (await db.execute(bump_data_version(user_id))).scalar_one()
+
+async def _insert_todos(db: AsyncSession, user_id: int, revision: int, rows: List[dict]) -> List[int]:
+    """以一条 executemany 语句插入同一 revision 的待办事项，按插入顺序返回新id"""
+    # 不带 RETURNING 才能合并为一条语句；同一事务内 revision 相同的行按 id 顺序即为插入顺序，
+    # 借助 (user_id, revision, id) 索引取回新id
+    await db.execute(insert(TodoModel), rows)
+    result = await db.execute(select(TodoModel.id).where(
         TodoModel.user_id == user_id,
-        TodoModel.completed == True
-    ).all()
-    if todos:
-        ml_service.train_model(todos)
+        TodoModel.revision == revision
+    ).order_by(TodoModel.id))
+    todo_ids = list(result.scalars())
+    if len(todo_ids) != len(rows):
+        raise RuntimeError(f"新建的待办事项数量不一致: {len(todo_ids)} != {len(rows)}")
+    return todo_ids
+
+async def _collect_changes(
+    db: AsyncSession,
+    user_id: Optional[int],
+    since: Optional[str],
+    limit: int
+) -> TodoChanges:
+    """按 (revision, id) 顺序返回游标之后修改过的待办事项和删除记录，since 为空时从头返回全部
+
+    游标早于已清理的删除记录时返回 410。
+    """
+    if user_id is None:
+        return TodoChanges(cursor=_encode_sync_cursor(0))
+
+    # 先读数据版本：之后提交的写入最多被下一次同步重复返回，不会遗漏
+    version = await get_data_version(db, user_id)
+    query = select(TodoModel).options(
+        load_only(*[getattr(TodoModel, name) for name in TODO_LIST_FIELDS])
+    ).where(TodoModel.user_id == user_id)
+    since_revision = None
+    if since:
+        since_revision, since_id = _decode_sync_cursor(since)
+        await _check_sync_cursor(db, user_id, since_revision)
+        if since_id is None:
+            query = query.where(TodoModel.revision > since_revision)
+        else:
+            query = query.where(or_(
+                TodoModel.revision > since_revision,
+                and_(TodoModel.revision == since_revision, TodoModel.id > since_id)
+            ))
+
+    rows = (await db.execute(
+        query.order_by(TodoModel.revision, TodoModel.id).limit(limit + 1)
+    )).scalars().all()
+    has_more = len(rows) > limit
+    if has_more:
+        rows = rows[:limit]
+        until = rows[-1].revision
+        cursor = _encode_sync_cursor(until, rows[-1].id)
+    else:
+        until = version
+        cursor = _encode_sync_cursor(version)
+
+    deleted = []
+    if since_revision is not None:
+        result = await db.execute(select(TodoTombstone.todo_id).where(
+            TodoTombstone.user_id == user_id,
+            TodoTombstone.revision > since_revision,
+            TodoTombstone.revision <= until
+        ).order_by(TodoTombstone.revision))
+        deleted = list(result.scalars())
+
+    return TodoChanges(
+        todos=[Todo.model_validate(row) for row in rows],
+        deleted=deleted,
+        cursor=cursor,
+        has_more=has_more
+    )
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in selected if f not in TODO_LIST_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"未知字段: {', '.join(unknown)}")
+    return selected
+
+def _merge_headers(target: Response, response: Response) -> Response:
+    """直接返回 Response 时，带上依赖中设置的 cookie 等响应头"""
+    target.raw_headers.extend(
+        (k, v) for k, v in response.raw_headers if k.lower() != b"content-length"
+    )
+    return target
+
+def _json_response(content, response: Response) -> JSONResponse:
+    return _merge_headers(JSONResponse(content=jsonable_encoder(content)), response)
+
+async def _conditional_response(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    user_id: int,
+    build: Callable[[], Awaitable[Tuple[object, Dict[str, str]]]]
+) -> Response:
+    """按用户数据版本生成强 ETag：If-None-Match 命中时返回 304，否则优先使用缓存的响应体
+
+    build 返回 (响应内容, 额外响应头)，只在缓存未命中时调用。
+    """
+    version = await get_data_version(db, user_id)
+    key = response_cache.make_key(user_id, version, request.url.path, request.query_params.multi_items())
+    headers = {
+        "ETag": response_cache.etag(key),
+        "Cache-Control": CACHE_CONTROL,
+        SYNC_CURSOR_HEADER: _encode_sync_cursor(version),
+    }
+
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        response_cache.record_not_modified()
+        return _merge_headers(Response(status_code=304, headers=headers), response)
+
+    cached = response_cache.get(key)
+    if cached is None:
+        content, extra_headers = await build()
+        cached = (response_cache.serialize(jsonable_encoder(content)), extra_headers)
+        response_cache.set(key, *cached)
+    body, extra_headers = cached
+    return _merge_headers(
+        Response(content=body, media_type="application/json", headers={**headers, **extra_headers}),
+        response
+    )
 
 @router.get("/", response_model=List[Todo])
 async def get_todos(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
     category: str = None,
-    priority: str = None
+    priority: str = None,
+    completed: Optional[bool] = None,
+    due_before: Optional[datetime] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
 ):
-    query = db.query(TodoModel).filter(TodoModel.user_id == current_user.id)
+    """按 (created_at, id) 升序分页返回待办事项，还有下一页时在 X-Next-Cursor 响应头中返回游标
+
+    fields 为逗号分隔的字段名，只查询并返回这些列。数据未变化时按 ETag 返回 304。
+    """
+    selected = _parse_fields(fields)
+    # 还没有写入过数据的游客没有待办事项，不需要查询数据库
+    if current_user.id is None:
+        return _json_response([], response) if selected else []
+    cursor_key = _decode_cursor(cursor) if cursor else None
+
+    async def build():
+        return await _query_todos(db, current_user.id, selected, category, priority,
+                                  completed, due_before, limit, cursor_key)
+
+    return await _conditional_response(request, response, db, current_user.id, build)
+
+async def _query_todos(
+    db: AsyncSession,
+    user_id: int,
+    selected: Optional[List[str]],
+    category: Optional[str],
+    priority: Optional[str],
+    completed: Optional[bool],
+    due_before: Optional[datetime],
+    limit: int,
+    cursor_key: Optional[Tuple[datetime, int]]
+) -> Tuple[list, Dict[str, str]]:
+    if selected:
+        # 游标需要 created_at 和 id，查询时总是带上
+        columns = list(dict.fromkeys(selected + ["created_at", "id"]))
+        query = select(*[getattr(TodoModel, name) for name in columns])
+    else:
+        # 不加载 steps 等列表接口用不到的列
+        query = select(TodoModel).options(
+            load_only(*[getattr(TodoModel, name) for name in TODO_LIST_FIELDS])
+        )
+    query = query.where(TodoModel.user_id == user_id)
     
     if category:
-        query = query.filter(TodoModel.category == category)
+        query = query.where(TodoModel.category == category)
     if priority:
-        query = query.filter(TodoModel.priority == priority)
-        
-    return query.all()
+        query = query.where(TodoModel.priority == priority)
+    if completed is not None:
+        query = query.where(TodoModel.completed == completed)
+    if due_before is not None:
+        query = query.where(TodoModel.due_date < due_before)
+    if cursor_key:
+        created_at, todo_id = cursor_key
+        query = query.where(or_(
+            TodoModel.created_at > created_at,
+            and_(TodoModel.created_at == created_at, TodoModel.id > todo_id)
+        ))
+
+    # 多取一条判断是否还有下一页
+    result = await db.execute(query.order_by(TodoModel.created_at, TodoModel.id).limit(limit + 1))
+    rows = result.all() if selected else result.scalars().all()
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers[NEXT_CURSOR_HEADER] = _encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    if selected:
+        return [{name: getattr(row, name) for name in selected} for row in rows], headers
+    return [Todo.model_validate(row) for row in rows], headers
 
 @router.post("/", response_model=TodoResponse)
 async def create_todo(
     todo: TodoCreate,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_writable_user)
 ):
     """创建新的待办事项，包含AI分析"""
     logger.info(f"收到待办事项创建请求: text={todo.text}, user={current_user.username}")
     
+    if enrichment_worker.deferred:
+        return await _create_todo_deferred(todo, db, current_user)
+
     try:
         # 生成AI建议
-        analysis = generate_todo_suggestions(todo.text, todo.due_date)
+        analysis = await generate_todo_suggestions(todo.text, todo.due_date, current_user.id)
         logger.info(f"AI分析完成: category={analysis.get('category')}, priority={analysis.get('priority')}")
         
         # 创建新的todo记录
@@ -71,15 +398,17 @@ async def create_todo(
             estimated_hours=float(analysis.get("estimated_hours", 1.0)),
             priority_reasoning=analysis.get("reasoning", ""),
             created_at=datetime.now(),
-            completed=False
+            completed=False,
+            revision=await _next_revision(db, current_user.id)
         )
         
         db.add(db_todo)
-        db.commit()
-        db.refresh(db_todo)
+        await db.commit()
+        await db.refresh(db_todo)
         
         # 在后台训练模型
-        background_tasks.add_task(train_ml_model, db, current_user.id)
+        training_scheduler.schedule(current_user.id)
+        event_hub.publish(current_user.id, "todo.created", ids=[db_todo.id], revision=db_todo.revision)
         
         logger.info(f"待办事项已创建: id={db_todo.id}")
         
@@ -115,12 +444,53 @@ async def create_todo(
             actual_completion_time=db_todo.actual_completion_time,
             completed_at=db_todo.completed_at,
             steps=todo_analysis.steps,
-            analysis=todo_analysis
+            analysis=todo_analysis,
+            enrichment_status=db_todo.enrichment_status
         )
         
     except Exception as e:
         logger.error(f"创建待办事项时发生错误: {str(e)}", exc_info=True)
-        db.rollback()
+        await db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "message": "创建待办事项时发生错误",
+                "error": str(e)
+            }
+        )
+
+async def _create_todo_deferred(
+    todo: TodoCreate,
+    db: AsyncSession,
+    current_user: CurrentUser
+) -> TodoResponse:
+    """先用本地模型的优先级入库，AI字段由补充队列在后台填写"""
+    try:
+        ml_model = await model_registry.get_async(current_user.id)
+        ml_priority = ml_model.predict_priority(todo.text, todo.due_date)
+        db_todo = TodoModel(
+            text=todo.text,
+            user_id=current_user.id,
+            category=todo.category or "未分类",
+            priority=todo.priority or ml_priority,
+            due_date=todo.due_date,
+            estimated_hours=1.0,
+            created_at=datetime.now(),
+            completed=False,
+            revision=await _next_revision(db, current_user.id)
+        )
+        db.add(db_todo)
+        await db.flush()
+        enrichment_worker.enqueue(
+            db, db_todo,
+            keep_category=bool(todo.category),
+            keep_priority=bool(todo.priority)
+        )
+        await db.commit()
+        await db.refresh(db_todo)
+    except Exception as e:
+        logger.error(f"创建待办事项时发生错误: {str(e)}", exc_info=True)
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail={
@@ -129,18 +499,287 @@ async def create_todo(
             }
         )
 
+    enrichment_worker.notify()
+    training_scheduler.schedule(current_user.id)
+    event_hub.publish(current_user.id, "todo.created", ids=[db_todo.id], revision=db_todo.revision)
+    logger.info(f"待办事项已创建，等待AI补充: id={db_todo.id}")
+    return _build_todo_response(db_todo)
+
+def _check_bulk_size(count: int) -> None:
+    if count > MAX_BULK_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"单次最多处理 {MAX_BULK_ITEMS} 条"
+        )
+
+def _invalid_priority(priority: Optional[str]) -> Optional[str]:
+    if priority is None or priority in PriorityEnum._value2member_map_:
+        return None
+    return f"无效的优先级: {priority}"
+
+@router.post("/bulk", response_model=List[BulkItemResult])
+async def bulk_create_todos(
+    items: List[TodoCreate],
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_writable_user)
+):
+    """在一个事务中批量创建待办事项，AI字段统一交给补充队列在后台填写"""
+    _check_bulk_size(len(items))
+    results = [BulkItemResult(index=idx, status="created") for idx in range(len(items))]
+    valid = []
+    for idx, item in enumerate(items):
+        error = _invalid_priority(item.priority)
+        if error:
+            results[idx] = BulkItemResult(index=idx, status="invalid", error=error)
+        else:
+            valid.append(idx)
+    if not valid:
+        return results
+
+    # 未指定优先级的条目一次性批量预测
+    ml_model = await model_registry.get_async(current_user.id)
+    ml_priorities = ml_model.predict_priority_batch(
+        [items[idx].text for idx in valid],
+        [items[idx].due_date for idx in valid]
+    )
+    now = datetime.now()
+    rows = [{
+        "text": items[idx].text,
+        "user_id": current_user.id,
+        "category": items[idx].category or "未分类",
+        "priority": items[idx].priority or ml_priority,
+        "due_date": items[idx].due_date,
+        "estimated_hours": 1.0,
+        "created_at": now,
+        "completed": False,
+        "enrichment_status": "pending",
+    } for idx, ml_priority in zip(valid, ml_priorities)]
+
+    try:
+        revision = await _next_revision(db, current_user.id)
+        for row in rows:
+            row["revision"] = revision
+        todo_ids = await _insert_todos(db, current_user.id, revision, rows)
+        await enrichment_worker.enqueue_many(db, [{
+            "todo_id": todo_id,
+            "keep_category": bool(items[idx].category),
+            "keep_priority": bool(items[idx].priority),
+        } for idx, todo_id in zip(valid, todo_ids)])
+        await db.commit()
+    except Exception as e:
+        logger.error(f"批量创建待办事项时发生错误: {str(e)}", exc_info=True)
+        await db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "message": "批量创建待办事项时发生错误",
+                "error": str(e)
+            }
+        )
+
+    for idx, todo_id in zip(valid, todo_ids):
+        results[idx].id = todo_id
+    # 整批只唤醒一次补充队列、登记一次训练
+    enrichment_worker.notify()
+    training_scheduler.schedule(current_user.id)
+    event_hub.publish(current_user.id, "todo.created", ids=todo_ids, revision=revision)
+    logger.info(f"批量创建待办事项: user={current_user.username}, count={len(todo_ids)}")
+    return results
+
+@router.patch("/bulk", response_model=List[BulkItemResult])
+async def bulk_update_todos(
+    items: List[BulkTodoUpdate],
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """在一个事务中批量更新待办事项，只修改每项中传入的字段"""
+    _check_bulk_size(len(items))
+    owned = set()
+    if current_user.id is not None and items:
+        result = await db.execute(select(TodoModel.id).where(
+            TodoModel.user_id == current_user.id,
+            TodoModel.id.in_({item.id for item in items})
+        ))
+        owned = set(result.scalars())
+
+    results = []
+    rows = []
+    any_completed = False
+    for idx, item in enumerate(items):
+        if item.id not in owned:
+            results.append(BulkItemResult(index=idx, id=item.id, status="not_found"))
+            continue
+        error = _invalid_priority(item.priority)
+        if error:
+            results.append(BulkItemResult(index=idx, id=item.id, status="invalid", error=error))
+            continue
+        values = item.dict(exclude_unset=True)
+        if item.completed:
+            values["completed_at"] = datetime.utcnow()
+            any_completed = True
+        rows.append(values)
+        results.append(BulkItemResult(index=idx, id=item.id, status="updated"))
+
+    if rows:
+        try:
+            revision = await _next_revision(db, current_user.id)
+            for values in rows:
+                values["revision"] = revision
+            # 按主键批量更新，相同字段组合的行合并为一条 executemany 语句
+            await db.execute(update(TodoModel), rows)
+            await db.commit()
+        except Exception as e:
+            logger.error(f"批量更新待办事项时发生错误: {str(e)}", exc_info=True)
+            await db.rollback()
+            raise HTTPException(
+                status_code=500,
+                detail={
+                    "message": "批量更新待办事项时发生错误",
+                    "error": str(e)
+                }
+            )
+        event_hub.publish(current_user.id, "todo.updated", ids=[values["id"] for values in rows], revision=revision)
+
+    if any_completed:
+        training_scheduler.schedule(current_user.id)
+    return results
+
+@router.delete("/bulk", response_model=List[BulkItemResult])
+async def bulk_delete_todos(
+    request: BulkDeleteRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """在一个事务中批量删除待办事项"""
+    _check_bulk_size(len(request.ids))
+    owned = set()
+    if current_user.id is not None and request.ids:
+        result = await db.execute(select(TodoModel.id).where(
+            TodoModel.user_id == current_user.id,
+            TodoModel.id.in_(set(request.ids))
+        ))
+        owned = set(result.scalars())
+
+    if owned:
+        # 同时删除尚未执行的补充任务
+        await db.execute(delete(EnrichmentJob).where(EnrichmentJob.todo_id.in_(owned)))
+        await db.execute(delete(TodoModel).where(TodoModel.id.in_(owned)))
+        revision = await _next_revision(db, current_user.id)
+        await db.execute(insert(TodoTombstone), [
+            {"todo_id": todo_id, "user_id": current_user.id, "revision": revision}
+            for todo_id in owned
+        ])
+        await _prune_tombstones(db, current_user.id)
+        await db.commit()
+        event_hub.publish(current_user.id, "todo.deleted", ids=sorted(owned), revision=revision)
+
+    return [
+        BulkItemResult(index=idx, id=todo_id, status="deleted" if todo_id in owned else "not_found")
+        for idx, todo_id in enumerate(request.ids)
+    ]
+
+async def _import_todos(
+    db: AsyncSession,
+    user_id: int,
+    items: List[TodoImportItem],
+    enrich: bool
+) -> List[int]:
+    """在一个事务中写入一批完整的待办事项（导入或游客上传），返回按顺序的新id
+
+    没有给出有效优先级的条目用本地模型批量预测；enrich 为 True 时没有AI建议的条目交给补充队列。
+    """
+    missing = [idx for idx, item in enumerate(items)
+               if item.priority is None or _invalid_priority(item.priority)]
+    predicted = {}
+    if missing:
+        ml_model = await model_registry.get_async(user_id)
+        predicted = dict(zip(missing, ml_model.predict_priority_batch(
+            [items[idx].text for idx in missing],
+            [items[idx].due_date for idx in missing]
+        )))
+    now = datetime.now()
+    revision = await _next_revision(db, user_id)
+    rows = [{
+        "text": item.text,
+        "user_id": user_id,
+        "category": item.category or "未分类",
+        "priority": predicted.get(idx, item.priority),
+        "due_date": item.due_date,
+        "estimated_hours": item.estimated_hours or 1.0,
+        "ai_generated_notes": item.ai_generated_notes,
+        "priority_reasoning": item.priority_reasoning,
+        "actual_completion_time": item.actual_completion_time,
+        "steps": item.steps,
+        "current_step": item.current_step or 0,
+        "created_at": item.created_at or now,
+        "completed": item.completed,
+        "completed_at": item.completed_at or (now if item.completed else None),
+        "enrichment_status": "pending" if enrich and not item.ai_generated_notes else "done",
+        "revision": revision,
+    } for idx, item in enumerate(items)]
+
+    todo_ids = await _insert_todos(db, user_id, revision, rows)
+    jobs = []
+    if enrich:
+        jobs = [{
+            "todo_id": todo_id,
+            "keep_category": bool(item.category),
+            "keep_priority": idx not in predicted,
+        } for idx, (item, todo_id) in enumerate(zip(items, todo_ids)) if not item.ai_generated_notes]
+        await enrichment_worker.enqueue_many(db, jobs)
+    await db.commit()
+
+    if jobs:
+        enrichment_worker.notify()
+    if any(item.completed for item in items):
+        training_scheduler.schedule(user_id)
+    event_hub.publish(user_id, "todo.created", ids=todo_ids, revision=revision)
+    return todo_ids
+
+@router.post("/sync", response_model=TodoSyncResponse)
+async def push_guest_todos(
+    request: TodoSyncRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_writable_user)
+):
+    """把游客保存在浏览器本地的待办事项一次性上传，并返回 since 之后的修改
+
+    登录后调用，响应中的 id_map 给出本地id对应的服务端id。已有AI建议的条目直接入库，
+    其余交给补充队列在后台填写。
+    """
+    items = request.todos
+    _check_bulk_size(len(items))
+    if request.since:
+        # 游标过期时在上传之前返回 410，避免客户端重试时重复上传
+        await _check_sync_cursor(db, current_user.id, _decode_sync_cursor(request.since)[0])
+    id_map = {}
+    if items:
+        try:
+            todo_ids = await _import_todos(db, current_user.id, items, enrich=True)
+        except Exception as e:
+            logger.error(f"上传游客待办事项时发生错误: {str(e)}", exc_info=True)
+            await db.rollback()
+            raise HTTPException(
+                status_code=500,
+                detail={
+                    "message": "上传游客待办事项时发生错误",
+                    "error": str(e)
+                }
+            )
+        id_map = {item.client_id: todo_id for item, todo_id in zip(items, todo_ids)}
+        logger.info(f"上传游客待办事项: user={current_user.username}, count={len(todo_ids)}")
+
+    changes = await _collect_changes(db, current_user.id, request.since, MAX_PAGE_SIZE)
+    return TodoSyncResponse(**dict(changes), id_map=id_map)
+
 @router.put("/{todo_id}", response_model=TodoResponse)
-def update_todo(
+async def update_todo(
     todo_id: int,
     todo_update: TodoUpdate,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    todo = db.query(TodoModel).filter(
-        TodoModel.id == todo_id,
-        TodoModel.user_id == current_user.id
-    ).first()
+    todo = await _get_user_todo(db, todo_id, current_user)
     
     if todo is None:
         raise HTTPException(status_code=404, detail="Todo not found")
@@ -157,12 +796,14 @@ def update_todo(
         if todo.completed:
             todo.completed_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(todo)
+    todo.revision = await _next_revision(db, current_user.id)
+    await db.commit()
+    await db.refresh(todo)
     
     # 如果任务完成，在后台训练模型
     if todo.completed:
-        background_tasks.add_task(train_ml_model, db, current_user.id)
+        training_scheduler.schedule(current_user.id)
+    event_hub.publish(current_user.id, "todo.updated", ids=[todo.id], revision=todo.revision)
     
     # 构建响应
     todo_analysis = TodoAnalysis(
@@ -196,48 +837,277 @@ def update_todo(
         actual_completion_time=todo.actual_completion_time,
         completed_at=todo.completed_at,
         steps=todo_analysis.steps,
-        analysis=todo_analysis
+        analysis=todo_analysis,
+        enrichment_status=todo.enrichment_status
     )
 
 @router.delete("/{todo_id}")
-def delete_todo(
+async def delete_todo(
     todo_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    todo = db.query(TodoModel).filter(
-        TodoModel.id == todo_id,
-        TodoModel.user_id == current_user.id
-    ).first()
+    todo = await _get_user_todo(db, todo_id, current_user)
     if todo is None:
         raise HTTPException(status_code=404, detail="Todo not found")
-    db.delete(todo)
-    db.commit()
+    # 同时删除尚未执行的补充任务
+    await db.execute(delete(EnrichmentJob).where(EnrichmentJob.todo_id == todo.id))
+    await db.delete(todo)
+    tombstone = TodoTombstone(
+        todo_id=todo.id,
+        user_id=current_user.id,
+        revision=await _next_revision(db, current_user.id)
+    )
+    db.add(tombstone)
+    await _prune_tombstones(db, current_user.id)
+    await db.commit()
+    event_hub.publish(current_user.id, "todo.deleted", ids=[todo_id], revision=tombstone.revision)
     return {"message": "Todo deleted successfully"}
 
 @router.get("/categories")
-def get_categories(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def get_categories(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    categories = db.query(TodoModel.category).filter(
-        TodoModel.user_id == current_user.id
-    ).distinct().all()
-    return [cat[0] for cat in categories if cat[0]]
+    if current_user.id is None:
+        return []
+
+    async def build():
+        categories = await stats_service.categories(db, current_user.id)
+        return [item["category"] for item in categories], {}
+
+    return await _conditional_response(request, response, db, current_user.id, build)
 
 @router.get("/model-stats")
-def get_model_stats(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def get_model_stats(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """获取模型统计信息"""
-    completed_todos = db.query(TodoModel).filter(
-        TodoModel.user_id == current_user.id,
-        TodoModel.completed == True
-    ).count()
-    
-    return {
-        "completed_todos": completed_todos,
-        "min_samples_needed": ml_service.min_samples_for_training,
-        "model_ready": completed_todos >= ml_service.min_samples_for_training
-    } 
\ No newline at end of file
+    def stats(completed_todos: int) -> dict:
+        return {
+            "completed_todos": completed_todos,
+            "min_samples_needed": model_registry.min_samples_for_training,
+            "model_ready": completed_todos >= model_registry.min_samples_for_training
+        }
+
+    if current_user.id is None:
+        return stats(0)
+
+    async def build():
+        return stats(await stats_service.completed_count(db, current_user.id)), {}
+
+    return await _conditional_response(request, response, db, current_user.id, build)
+
+
+@router.get("/stats", response_model=TodoStats)
+async def get_todo_stats(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """待办事项统计：数量、按优先级和分类的分布、预估工时与实际用时、逾期数量
+
+    逾期数量随时间变化，此接口不使用 ETag 缓存。
+    """
+    if current_user.id is None:
+        summary = dict.fromkeys(STATS_CONTRIBUTIONS, 0)
+        categories, overdue = [], 0
+    else:
+        summary = await stats_service.summary(db, current_user.id)
+        categories = await stats_service.categories(db, current_user.id)
+        overdue = await stats_service.overdue_count(db, current_user.id)
+
+    return TodoStats(
+        total=summary["total_count"],
+        completed=summary["completed_count"],
+        open=summary["total_count"] - summary["completed_count"],
+        overdue=overdue,
+        by_priority={
+            "high": summary["high_count"],
+            "medium": summary["medium_count"],
+            "low": summary["low_count"],
+        },
+        by_category=categories,
+        estimated_hours=round(summary["estimated_hours"], 2),
+        tracked_count=summary["tracked_count"],
+        tracked_estimated_hours=round(summary["tracked_estimated_hours"], 2),
+        tracked_actual_hours=round(summary["tracked_actual_hours"], 2)
+    )
+
+@router.post("/predict-priority", response_model=List[PriorityPrediction])
+def predict_priority(
+    items: List[PriorityPredictionRequest],
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """批量预测优先级，用于重新评估整个列表或批量导入"""
+    if len(items) > MAX_PREDICTION_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"单次最多预测 {MAX_PREDICTION_BATCH} 条"
+        )
+    priorities = model_registry.get(current_user.id).predict_priority_batch(
+        [item.text for item in items],
+        [item.due_date for item in items]
+    )
+    return [
+        PriorityPrediction(text=item.text, priority=priority)
+        for item, priority in zip(items, priorities)
+    ]
+
+@router.get("/changes", response_model=TodoChanges)
+async def get_changes(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    since: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    """增量同步：返回 since 游标之后新增、修改和删除的待办事项
+
+    since 来自上一次响应的 cursor 或列表接口的 X-Sync-Cursor 响应头；has_more 为 true 时
+    用新的 cursor 继续请求。游标之后的删除记录已超过保留期被清理时返回 410，客户端需要不带 since 重新全量同步。
+    """
+    return await _collect_changes(db, current_user.id, since, limit)
+
+@router.get("/events")
+async def stream_events(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """服务器推送事件流（SSE）：待办事项新增/修改/删除、AI补充完成和模型重新训练
+
+    事件只包含 id 和 revision，客户端收到后用 GET /todos/changes 增量更新。
+    收到 resync 事件表示消费太慢、连接被断开，重连后需要增量同步一次。
+    """
+    # 认证完成后就不再需要数据库，避免在整个连接期间占用连接
+    await db.close()
+    if current_user.id is None:
+        # 还没有写入过数据的游客没有事件；204 让 EventSource 不再重连
+        return Response(status_code=204)
+    return StreamingResponse(
+        event_hub.stream(current_user.id, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/export")
+async def export_todos(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    export_format: str = Query("ndjson", alias="format", pattern=f"^({'|'.join(FORMATS)})$")
+):
+    """流式导出当前用户的全部待办事项，格式为 NDJSON（每行一个 JSON 对象）或 CSV
+
+    按创建时间顺序分批从数据库游标读取并写出，导出文件可以直接用 POST /todos/import 导入。
+    """
+    # 导出使用独立的会话，不在整个下载期间占用请求的连接
+    await db.close()
+    filename = f"todos.{export_format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"}
+    if current_user.id is None:
+        return Response(transfer_service.header(export_format), media_type=MEDIA_TYPES[export_format], headers=headers)
+    return StreamingResponse(
+        transfer_service.export(current_user.id, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers=headers
+    )
+
+@router.post("/import", response_model=TodoImportResult)
+async def import_todos(
+    file: UploadFile = File(...),
+    import_format: Optional[str] = Query(None, alias="format", pattern=f"^({'|'.join(FORMATS)})$"),
+    enrich: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_writable_user)
+):
+    """导入 NDJSON 或 CSV 文件，字段与导出文件一致（id、enrichment_status 被忽略）
+
+    文件逐行解析，每 IMPORT_CHUNK_SIZE 条在一个事务中写入；无效的行跳过并在 errors 中返回行号。
+    format 未指定时按文件扩展名判断，默认 NDJSON。enrich 为 true 时没有AI建议的条目交给后台补充队列。
+    文件必须是 UTF-8 编码，否则在写入任何数据之前返回 400。
+    """
+    if import_format is None:
+        import_format = "csv" if (file.filename or "").lower().endswith(".csv") else "ndjson"
+    # 分批写入开始后再发现编码错误会留下导入了一半的数据，先完整检查一遍
+    decode_error = await asyncio.to_thread(transfer_service.find_decode_error, file.file)
+    if decode_error:
+        raise HTTPException(status_code=400, detail=decode_error)
+
+    records = transfer_service.iter_records(file.file, import_format)
+    imported, skipped = 0, 0
+    errors: List[TodoImportError] = []
+
+    def reject(line: int, error: str) -> None:
+        nonlocal skipped
+        skipped += 1
+        if len(errors) < MAX_IMPORT_ERRORS:
+            errors.append(TodoImportError(line=line, error=error))
+
+    while True:
+        # 解析在线程中进行，避免大文件阻塞事件循环
+        chunk = await asyncio.to_thread(list, islice(records, transfer_service.import_chunk_size))
+        if not chunk:
+            break
+        items = []
+        for line, record in chunk:
+            if isinstance(record, str):
+                reject(line, record)
+                continue
+            try:
+                items.append(TodoImportItem.model_validate(record))
+            except ValidationError as e:
+                reject(line, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+        if not items:
+            continue
+        try:
+            imported += len(await _import_todos(db, current_user.id, items, enrich))
+        except Exception as e:
+            logger.error(f"导入待办事项时发生错误: {str(e)}", exc_info=True)
+            await db.rollback()
+            raise HTTPException(
+                status_code=500,
+                detail={
+                    "message": "导入待办事项时发生错误",
+                    "imported": imported,
+                    "error": str(e)
+                }
+            )
+
+    logger.info(f"导入待办事项: user={current_user.username}, imported={imported}, skipped={skipped}")
+    return TodoImportResult(imported=imported, skipped=skipped, errors=errors)
+
+@router.get("/search", response_model=List[Todo])
+async def search_todos(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """在标题、AI建议和分类中搜索，按相关度排序；还有更多结果时在 X-Next-Offset 响应头中返回下一页的 offset"""
+    if current_user.id is None:
+        return []
+    # 多取一条判断是否还有下一页
+    todos = await search_service.search(db, current_user.id, q, limit + 1, offset)
+    if len(todos) > limit:
+        todos = todos[:limit]
+        response.headers[NEXT_OFFSET_HEADER] = str(offset + limit)
+    return todos
+
+# 放在最后，避免 /categories、/model-stats 等路径被当作 todo_id 匹配
+@router.get("/{todo_id}", response_model=TodoResponse)
+async def get_todo(
+    todo_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """获取单个待办事项，AI补充完成后返回补全后的字段"""
+    todo = await _get_user_todo(db, todo_id, current_user)
+    if todo is None:
+        raise HTTPException(status_code=404, detail="Todo not found")
+    return _build_todo_response(todo)
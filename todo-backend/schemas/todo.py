@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationInfo, field_validator
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from models.todo import PriorityEnum
 
 class TodoStep(BaseModel):
@@ -30,6 +30,42 @@ class TodoUpdate(TodoBase):
     steps: Optional[List[TodoStep]] = None
     actual_completion_time: Optional[float] = None
 
+class BulkTodoUpdate(BaseModel):
+    """批量更新中的一项，只修改传入的字段"""
+    id: int
+    text: Optional[str] = None
+    due_date: Optional[datetime] = None
+    category: Optional[str] = None
+    priority: Optional[str] = None
+    completed: Optional[bool] = None
+    steps: Optional[List[TodoStep]] = None
+    actual_completion_time: Optional[float] = None
+
+    @field_validator("text", "completed", "category", "priority", mode="before")
+    @classmethod
+    def _reject_null(cls, value, info: ValidationInfo):
+        # 这些列不允许为空：不修改时不传该字段，显式的 null 会写坏列表和同步接口依赖的数据
+        if value is None:
+            raise ValueError(f"{info.field_name} 不能为 null，不修改时请省略该字段")
+        return value
+
+class BulkDeleteRequest(BaseModel):
+    ids: List[int]
+
+class BulkItemResult(BaseModel):
+    index: int  # 在请求中的位置
+    id: Optional[int] = None
+    status: str  # created / updated / deleted / not_found / invalid
+    error: Optional[str] = None
+
+class PriorityPredictionRequest(BaseModel):
+    text: str
+    due_date: Optional[datetime] = None
+
+class PriorityPrediction(BaseModel):
+    text: str
+    priority: str
+
 class TodoResponse(BaseModel):
     id: int
     text: str
@@ -45,6 +81,7 @@ class TodoResponse(BaseModel):
     completed_at: Optional[datetime] = None
     steps: List[TodoStep]
     analysis: Optional[TodoAnalysis] = None
+    enrichment_status: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -63,6 +100,69 @@ class Todo(BaseModel):
     priority_reasoning: Optional[str]
     actual_completion_time: Optional[float]
     completed_at: Optional[datetime]
+    enrichment_status: Optional[str] = None
+    revision: int = 0
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class TodoChanges(BaseModel):
+    """增量同步结果：客户端先删除 deleted 中的待办事项，再用 todos 覆盖本地记录"""
+    todos: List[Todo] = []
+    deleted: List[int] = []
+    cursor: str  # 下次请求 GET /todos/changes 时作为 since 传回
+    has_more: bool = False
+
+class TodoImportItem(BaseModel):
+    """导入或上传的一条完整待办事项，字段与导出文件一致"""
+    text: str
+    completed: bool = False
+    category: Optional[str] = None
+    priority: Optional[str] = None
+    due_date: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    estimated_hours: Optional[float] = None
+    ai_generated_notes: Optional[str] = None
+    priority_reasoning: Optional[str] = None
+    actual_completion_time: Optional[float] = None
+    current_step: Optional[int] = None
+    steps: Optional[List[Dict[str, Any]]] = None
+
+class TodoSyncItem(TodoImportItem):
+    """游客保存在浏览器本地的待办事项"""
+    client_id: int  # 浏览器本地的id
+
+class TodoSyncRequest(BaseModel):
+    since: Optional[str] = None
+    todos: List[TodoSyncItem] = []
+
+class TodoSyncResponse(TodoChanges):
+    id_map: Dict[int, int] = {}  # 本地id -> 服务端id
+
+class CategoryStats(BaseModel):
+    category: str
+    total: int
+    completed: int
+
+class TodoStats(BaseModel):
+    """GET /todos/stats 返回的汇总统计"""
+    total: int
+    completed: int
+    open: int
+    overdue: int  # 未完成且已过截止时间
+    by_priority: Dict[str, int]
+    by_category: List[CategoryStats]
+    estimated_hours: float  # 所有待办事项的预估工时之和
+    tracked_count: int  # 已完成且记录了实际用时的数量
+    tracked_estimated_hours: float
+    tracked_actual_hours: float
+
+class TodoImportError(BaseModel):
+    line: int  # 文件中的行号（CSV 为记录结束的行）
+    error: str
+
+class TodoImportResult(BaseModel):
+    imported: int
+    skipped: int
+    errors: List[TodoImportError] = []  # 最多返回前 100 条
@@ -0,0 +1,130 @@
+"""检查路由中的每条 SQL 是否都使用了索引
+
+在临时目录中创建一个新数据库并执行迁移，写入示例数据后通过 TestClient 调用
+待办事项和认证接口，记录实际执行的 SQL，再逐条执行 EXPLAIN QUERY PLAN。
+出现对业务表的全表扫描（没有 USING INDEX 的 SCAN）时以非零状态退出。
+
+用法（在 todo-backend 目录下运行）：
+    python scripts/check_query_plans.py
+"""
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+# 数据库文件使用相对路径，切换到临时目录避免影响本地数据库
+os.chdir(tempfile.mkdtemp(prefix="query-plans-"))
+
+from sqlalchemy import event
+from fastapi.testclient import TestClient
+
+import main
+from database.database import engine, async_engine, SessionLocal
+from database.migrations import run_migrations
+from models.todo import TodoModel
+from models.user import User
+
+CHECKED_TABLES = ("todos", "users", "enrichment_jobs", "todo_tombstones", "user_todo_stats", "user_category_stats")
+FULL_SCAN = re.compile(rf"^SCAN ({'|'.join(CHECKED_TABLES)})\b(?!.*USING)")
+
+def seed(username: str) -> int:
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == username).first()
+        now = datetime.utcnow()
+        for i in range(50):
+            db.add(TodoModel(
+                text=f"示例任务 {i}",
+                user_id=user.id,
+                category=f"分类{i % 5}",
+                priority=["low", "medium", "high"][i % 3],
+                due_date=now + timedelta(days=i),
+                created_at=now + timedelta(seconds=i),
+                estimated_hours=1.0,
+                completed=i % 4 == 0,
+            ))
+        db.commit()
+        return db.query(TodoModel.id).filter(TodoModel.user_id == user.id).first()[0]
+    finally:
+        db.close()
+
+def exercise_routes(client: TestClient) -> None:
+    token = client.post("/auth/register", json={
+        "username": "plan_user", "email": "plan_user@example.com", "password": "password"
+    }).json()["access_token"]
+    client.post("/auth/login", json={"username": "plan_user", "password": "password"})
+    headers = {"Authorization": f"Bearer {token}"}
+    todo_id = seed("plan_user")
+
+    client.get("/todos/", headers=headers)
+    page = client.get("/todos/", params={"limit": 10}, headers=headers)
+    client.get("/todos/", params={"cursor": page.headers["X-Next-Cursor"], "limit": 10}, headers=headers)
+    client.get("/todos/", params={"fields": "id,text,completed"}, headers=headers)
+    client.get("/todos/", params={"category": "分类1"}, headers=headers)
+    client.get("/todos/", params={"priority": "high"}, headers=headers)
+    client.get("/todos/", params={"completed": True}, headers=headers)
+    client.get("/todos/", params={"due_before": datetime.utcnow().isoformat()}, headers=headers)
+    client.get("/todos/search", params={"q": "示例任务"}, headers=headers)
+    client.get("/todos/search", params={"q": "任务"}, headers=headers)
+    client.get("/todos/search", params={"q": "示例任务 任"}, headers=headers)
+    client.get("/todos/categories", headers=headers)
+    client.get("/todos/model-stats", headers=headers)
+    client.get("/todos/stats", headers=headers)
+    client.get(f"/todos/{todo_id}", headers=headers)
+    client.put(f"/todos/{todo_id}", json={"text": "更新后的任务"}, headers=headers)
+    client.delete(f"/todos/{todo_id}", headers=headers)
+    created = client.post("/todos/bulk", json=[{"text": f"批量任务 {i}", "priority": "low"} for i in range(3)],
+                          headers=headers).json()
+    created_ids = [item["id"] for item in created]
+    client.patch("/todos/bulk", json=[{"id": i, "completed": True} for i in created_ids], headers=headers)
+    client.request("DELETE", "/todos/bulk", json={"ids": created_ids}, headers=headers)
+    changes = client.get("/todos/changes", params={"limit": 10}, headers=headers).json()
+    client.get("/todos/changes", params={"since": changes["cursor"]}, headers=headers)
+    client.post("/todos/sync", json={"since": changes["cursor"], "todos": [
+        {"client_id": 1, "text": "游客任务", "priority": "low", "ai_generated_notes": "建议"}
+    ]}, headers=headers)
+    exported = client.get("/todos/export", headers=headers).content
+    client.get("/todos/export", params={"format": "csv"}, headers=headers)
+    client.post("/todos/import", files={"file": ("todos.ndjson", exported)}, headers=headers)
+
+def main_check() -> int:
+    run_migrations(engine)
+    statements = {}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            # executemany 只需用第一组参数检查执行计划
+            statements.setdefault(statement, parameters[0] if executemany else parameters)
+
+    # 路由使用异步引擎，后台任务使用同步引擎，两者都记录
+    for target in (engine, async_engine.sync_engine):
+        event.listen(target, "before_cursor_execute", record)
+    with TestClient(main.app) as client:
+        exercise_routes(client)
+    for target in (engine, async_engine.sync_engine):
+        event.remove(target, "before_cursor_execute", record)
+
+    failures = 0
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for statement, parameters in statements.items():
+            if not any(table in statement for table in CHECKED_TABLES):
+                continue
+            plan = [row[3] for row in cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+            bad = [line for line in plan if FULL_SCAN.match(line)]
+            failures += bool(bad)
+            print("FAIL" if bad else "OK  ", " ".join(statement.split()))
+            for line in plan:
+                print(f"      {line}")
+    finally:
+        raw.close()
+
+    print(f"\n共检查 {len(statements)} 条语句，{failures} 条存在全表扫描")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main_check())
@@ -0,0 +1,42 @@
+"""统计 `import main` 的导入耗时，按累计时间列出最慢的模块
+
+用法（在 todo-backend 目录下运行）：
+    python scripts/import_breakdown.py [模块数量]
+"""
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def collect_import_times(module: str = "main"):
+    """用 -X importtime 在子进程中导入模块，返回 [(累计微秒, 自身微秒, 模块名)]"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{result.stderr}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    return rows
+
+def main():
+    top = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rows = collect_import_times()
+    total = next((cum for cum, _, name in rows if name == "main"), 0)
+
+    print(f"{'累计(ms)':>10} {'自身(ms)':>10}  模块")
+    for cumulative, self_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative / 1000:>10.1f} {self_us / 1000:>10.1f}  {name}")
+    print(f"\nimport main 总耗时: {total / 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""重建待办事项全文搜索索引
+
+索引由触发器自动维护，通常不需要手动重建。在绕过触发器直接导入数据、
+或怀疑索引与 todos 表不一致时运行（在 todo-backend 目录下）：
+    python scripts/rebuild_search_index.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.database import engine
+from database.migrations import run_migrations
+from services.search_service import search_service
+
+if __name__ == "__main__":
+    # 旧数据库先执行迁移创建索引表，迁移本身会为已有数据建立索引
+    run_migrations(engine)
+    if search_service.rebuild(engine):
+        print("全文搜索索引已重建")
+    else:
+        print("当前数据库不支持全文搜索索引（需要 SQLite 3.34 及以上）")
+        sys.exit(1)
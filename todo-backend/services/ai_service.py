@@ -1,32 +1,25 @@
+from .model_registry import model_registry
+from .llm_client import LLMClient, llm_client
+from .suggestion_cache import SuggestionCache, suggestion_cache
+from .batcher import MicroBatcher
 import os
-from openai import OpenAI
-from dotenv import load_dotenv
-from .ml_service import ml_service
 import json
+import asyncio
 import logging
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
-class AIServiceConfig:
-    def __init__(self):
-        load_dotenv()
-        self.api_key = os.getenv("OPENAI_API_KEY")
-        self.api_base = os.getenv("OPENAI_API_BASE")
-        self.model = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
-        
-        if not self.api_key:
-            raise ValueError("OPENAI_API_KEY 环境变量未设置")
-        if not self.api_base:
-            raise ValueError("OPENAI_API_BASE 环境变量未设置")
-
 class AIService:
-    def __init__(self):
-        self.config = AIServiceConfig()
-        self.client = OpenAI(
-            api_key=self.config.api_key,
-            base_url=self.config.api_base
+    def __init__(self, client: LLMClient = llm_client, cache: SuggestionCache = suggestion_cache):
+        self.client = client
+        self.cache = cache
+        # 短时间内的多个请求合并为一次LLM调用；LLM_BATCH_MAX_ITEMS=1 时关闭合并
+        self.batcher = MicroBatcher(
+            self._request_batch,
+            max_items=int(os.getenv("LLM_BATCH_MAX_ITEMS", "10")),
+            window=float(os.getenv("LLM_BATCH_WINDOW_MS", "50")) / 1000
         )
     
     def _create_prompt(self, text: str, ml_priority: str) -> str:
@@ -48,6 +41,31 @@ class AIService:
         - reasoning: 为什么选择这个优先级和分类的原因
         """
     
+    def _create_batch_prompt(self, items: List[Tuple[str, str]]) -> str:
+        todo_lines = "\n".join(
+            f"        [{idx}] {text}（机器学习模型建议的优先级：{ml_priority}）"
+            for idx, (text, ml_priority) in enumerate(items)
+        )
+        return f"""
+        请分别分析以下{len(items)}个待办事项，对每一项提供：
+        1. 合适的分类
+        2. 建议的优先级（high/medium/low）
+        3. 补充说明或建议
+        4. 预计所需时间（小时）
+        
+        待办事项列表：
+{todo_lines}
+        
+        请返回一个JSON数组，每个待办事项对应一个对象，包含以下字段：
+        - index: 待办事项的序号
+        - category: 分类
+        - priority: 优先级（请参考机器学习模型的建议）
+        - suggestions: 补充说明或建议
+        - estimated_hours: 预计完成所需时间（小时）
+        - reasoning: 为什么选择这个优先级和分类的原因
+        只返回JSON数组，不要包含其他内容。
+        """
+    
     def _get_default_response(self, ml_priority: str, error_msg: str = "无法获取AI建议") -> Dict:
         return {
             "category": "未分类",
@@ -57,45 +75,114 @@ class AIService:
             "reasoning": "使用机器学习模型的默认建议"
         }
     
-    def generate_todo_suggestions(self, text: str, due_date: Optional[datetime] = None) -> Dict:
-        """生成待办事项的建议，包括分类和补充内容"""
+    async def _request_suggestions(self, text: str, ml_priority: str) -> Dict:
+        """请求LLM生成建议，响应无法解析时抛出 json.JSONDecodeError"""
+        if self.batcher.max_items > 1:
+            return await self.batcher.submit((text, ml_priority))
+        return await self._request_single(text, ml_priority)
+    
+    async def _request_batch(self, items: List[Tuple[str, str]]) -> List:
+        """一次LLM调用处理一批待办事项，返回与 items 对应的建议或异常"""
+        if len(items) == 1:
+            return [await self._request_single(*items[0])]
+        
+        ai_response = await self.client.chat(
+            messages=[
+                {"role": "system", "content": "你是一个专业的任务管理助手，帮助用户更好地组织待办事项。"},
+                {"role": "user", "content": self._create_batch_prompt(items)}
+            ],
+            temperature=0.7,
+            max_tokens=300 * len(items)
+        )
+        
         try:
+            parsed = json.loads(ai_response)
+            if not isinstance(parsed, list):
+                raise json.JSONDecodeError("批量响应不是JSON数组", ai_response, 0)
+        except json.JSONDecodeError as e:
+            logger.error(f"批量AI响应解析失败: size={len(items)}, error={str(e)}")
+            return [e] * len(items)
+        
+        # 优先按 index 对应，缺失时按顺序对应
+        by_index = {
+            entry.get("index"): entry for entry in parsed
+            if isinstance(entry, dict) and isinstance(entry.get("index"), int)
+        }
+        results = []
+        for idx, (text, ml_priority) in enumerate(items):
+            entry = by_index.get(idx)
+            if entry is None and idx < len(parsed) and isinstance(parsed[idx], dict):
+                entry = parsed[idx]
+            if entry is None:
+                results.append(json.JSONDecodeError(f"批量响应缺少第{idx}项", ai_response, 0))
+                continue
+            entry = {k: v for k, v in entry.items() if k != "index"}
+            if entry.get("priority") not in ["low", "medium", "high"]:
+                entry["priority"] = ml_priority
+            results.append(entry)
+        logger.info(f"批量生成待办事项建议完成: size={len(items)}")
+        return results
+    
+    async def _request_single(self, text: str, ml_priority: str) -> Dict:
+        """单独请求一个待办事项的建议"""
+        prompt = self._create_prompt(text, ml_priority)
+        
+        ai_response = await self.client.chat(
+            messages=[
+                {"role": "system", "content": "你是一个专业的任务管理助手，帮助用户更好地组织待办事项。"},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=300
+        )
+        
+        suggestions_dict = json.loads(ai_response)
+        # 确保优先级与枚举值匹配
+        if suggestions_dict["priority"] not in ["low", "medium", "high"]:
+            suggestions_dict["priority"] = ml_priority
+        logger.info(f"成功生成待办事项建议: {suggestions_dict}")
+        return suggestions_dict
+    
+    async def request_todo_suggestions(
+        self,
+        text: str,
+        due_date: Optional[datetime] = None,
+        user_id: Optional[int] = None,
+        ml_priority: Optional[str] = None
+    ) -> Dict:
+        """生成待办事项的建议，LLM 调用失败、超时或响应无法解析时抛出异常，由调用方决定重试还是降级"""
+        if ml_priority is None:
             # 首先使用ML模型预测优先级
-            ml_priority = ml_service.predict_priority(text, due_date)
-            
-            # 准备并发送请求到OpenAI
-            prompt = self._create_prompt(text, ml_priority)
-            
-            response = self.client.chat.completions.create(
-                model=self.config.model,
-                messages=[
-                    {"role": "system", "content": "你是一个专业的任务管理助手，帮助用户更好地组织待办事项。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=300
-            )
-            
-            # 提取生成的内容
-            ai_response = response.choices[0].message.content
-            try:
-                suggestions_dict = json.loads(ai_response)
-                # 确保优先级与枚举值匹配
-                if suggestions_dict["priority"] not in ["low", "medium", "high"]:
-                    suggestions_dict["priority"] = ml_priority
-                logger.info(f"成功生成待办事项建议: {suggestions_dict}")
-                return suggestions_dict
-            except json.JSONDecodeError as e:
-                logger.error(f"AI响应解析失败: {str(e)}")
-                return self._get_default_response(ml_priority, "AI响应解析失败")
-                
+            ml_model = await model_registry.get_async(user_id)
+            ml_priority = ml_model.predict_priority(text, due_date)
+        # 相同任务复用缓存结果，并发的相同请求只调用一次LLM
+        key = self.cache.make_key(text, due_date, ml_priority)
+        return await self.cache.get_or_compute(
+            key, lambda: self._request_suggestions(text, ml_priority)
+        )
+    
+    async def generate_todo_suggestions(
+        self,
+        text: str,
+        due_date: Optional[datetime] = None,
+        user_id: Optional[int] = None
+    ) -> Dict:
+        """生成待办事项的建议，包括分类和补充内容；失败时返回使用机器学习模型优先级的默认建议"""
+        ml_model = await model_registry.get_async(user_id)
+        ml_priority = ml_model.predict_priority(text, due_date)
+        try:
+            return await self.request_todo_suggestions(text, due_date, user_id, ml_priority)
+        except json.JSONDecodeError as e:
+            logger.error(f"AI响应解析失败: {str(e)}")
+            return self._get_default_response(ml_priority, "AI响应解析失败")
+        except asyncio.TimeoutError:
+            logger.error(f"生成待办事项建议超时: timeout={self.client.config.timeout}s")
+            return self._get_default_response(ml_priority, "生成建议超时")
         except Exception as e:
             logger.error(f"生成待办事项建议时发生错误: {str(e)}", exc_info=True)
-            return self._get_default_response(
-                ml_service.predict_priority(text, due_date),
-                f"生成建议时发生错误: {str(e)}"
-            )
+            return self._get_default_response(ml_priority, f"生成建议时发生错误: {str(e)}")
 
 # 创建全局AI服务实例
 ai_service = AIService()
-generate_todo_suggestions = ai_service.generate_todo_suggestions 
\ No newline at end of file
+generate_todo_suggestions = ai_service.generate_todo_suggestions
+request_todo_suggestions = ai_service.request_todo_suggestions 
\ No newline at end of file
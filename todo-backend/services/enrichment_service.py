@@ -0,0 +1,235 @@
+import os
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Union
+from sqlalchemy import insert, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from database.database import SessionLocal
+from models.todo import TodoModel
+from models.enrichment import EnrichmentJob
+from .ai_service import request_todo_suggestions
+from .response_cache import bump_data_version
+from .event_hub import event_hub
+
+logger = logging.getLogger(__name__)
+
+class EnrichmentWorker:
+    """进程内的AI补充队列：待办事项先入库，分类/说明/工时等字段由后台补全"""
+
+    def __init__(self):
+        # sync: 创建时同步等待AI分析；deferred: 先返回，后台补全
+        self.mode = os.getenv("AI_ENRICHMENT_MODE", "sync")
+        self.batch_size = int(os.getenv("ENRICHMENT_BATCH_SIZE", "8"))
+        self.max_attempts = int(os.getenv("ENRICHMENT_MAX_ATTEMPTS", "3"))
+        self.poll_interval = float(os.getenv("ENRICHMENT_POLL_INTERVAL", "5"))
+        # 超过租约时间仍处于 running 的任务视为进程已退出，可被重新领取
+        self.lease_seconds = int(os.getenv("ENRICHMENT_LEASE_SECONDS", "300"))
+        # 第 n 次失败后等待 retry_base_seconds * 2^(n-1) 秒再重试，最长 retry_max_seconds
+        self.retry_base_seconds = float(os.getenv("ENRICHMENT_RETRY_BASE_SECONDS", "30"))
+        self.retry_max_seconds = float(os.getenv("ENRICHMENT_RETRY_MAX_SECONDS", "3600"))
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def deferred(self) -> bool:
+        return self.mode == "deferred"
+
+    def enqueue(self, db: Union[Session, AsyncSession], todo: TodoModel, keep_category: bool = False, keep_priority: bool = False) -> None:
+        """在调用方的事务中登记补充任务，随调用方一起提交"""
+        todo.enrichment_status = "pending"
+        db.add(EnrichmentJob(
+            todo_id=todo.id,
+            keep_category=keep_category,
+            keep_priority=keep_priority
+        ))
+
+    async def enqueue_many(self, db: AsyncSession, jobs: List[Dict]) -> None:
+        """用一条 executemany 语句批量登记补充任务，随调用方一起提交
+
+        jobs 中每项包含 todo_id、keep_category、keep_priority。
+        """
+        if jobs:
+            await db.execute(insert(EnrichmentJob), jobs)
+
+    def notify(self) -> None:
+        """唤醒后台任务，可在任意线程调用"""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"AI补充队列已启动: mode={self.mode}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._loop = None
+        self._wakeup = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                jobs = await asyncio.to_thread(self._claim_jobs)
+            except Exception as e:
+                logger.error(f"领取AI补充任务时发生错误: {str(e)}", exc_info=True)
+                jobs = []
+
+            if jobs:
+                await asyncio.gather(*(self._process(job) for job in jobs), return_exceptions=True)
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _claim_jobs(self) -> List[Dict]:
+        """原子地领取一批任务，多个进程同时运行时不会重复处理"""
+        token = uuid.uuid4().hex
+        now = datetime.utcnow()
+        lease_expired = now - timedelta(seconds=self.lease_seconds)
+        db = SessionLocal()
+        try:
+            claimable = or_(
+                (EnrichmentJob.status == "pending") & or_(
+                    EnrichmentJob.next_attempt_at.is_(None), EnrichmentJob.next_attempt_at <= now
+                ),
+                (EnrichmentJob.status == "running") & (EnrichmentJob.claimed_at < lease_expired)
+            )
+            ids = [row[0] for row in db.query(EnrichmentJob.id).filter(claimable)
+                   .order_by(EnrichmentJob.id).limit(self.batch_size).all()]
+            if not ids:
+                return []
+            db.query(EnrichmentJob).filter(EnrichmentJob.id.in_(ids), claimable).update(
+                {"status": "running", "claim_token": token, "claimed_at": now},
+                synchronize_session=False
+            )
+            db.commit()
+
+            rows = db.query(EnrichmentJob, TodoModel).outerjoin(
+                TodoModel, TodoModel.id == EnrichmentJob.todo_id
+            ).filter(EnrichmentJob.id.in_(ids), EnrichmentJob.claim_token == token).all()
+            jobs = []
+            for job, todo in rows:
+                if todo is None:
+                    # 待办事项已被删除
+                    db.delete(job)
+                    continue
+                jobs.append({
+                    "job_id": job.id,
+                    "claim_token": token,
+                    "todo_id": todo.id,
+                    "user_id": todo.user_id,
+                    "text": todo.text,
+                    "due_date": todo.due_date,
+                    "keep_category": job.keep_category,
+                    "keep_priority": job.keep_priority,
+                })
+            db.commit()
+            return jobs
+        finally:
+            db.close()
+
+    async def _process(self, job: Dict) -> None:
+        try:
+            # 失败时抛出异常而不是返回默认建议，由 _record_failure 计数并重试
+            analysis = await request_todo_suggestions(job["text"], job["due_date"], job["user_id"])
+            revision = await asyncio.to_thread(self._apply, job, analysis)
+            logger.info(f"AI补充完成: todo_id={job['todo_id']}")
+            status = "done"
+        except Exception as e:
+            logger.error(f"AI补充失败: todo_id={job['todo_id']}, error={str(e)}", exc_info=True)
+            revision = await asyncio.to_thread(self._record_failure, job, str(e))
+            status = "failed"
+        if revision is not None:
+            event_hub.publish(job["user_id"], "todo.enriched", ids=[job["todo_id"]], status=status, revision=revision)
+
+    def _claimed(self, db: Session, job: Dict):
+        """本次领取的任务行；待办事项被删除（任务随之删除）或任务已被重新领取时为空"""
+        return db.query(EnrichmentJob).filter(
+            EnrichmentJob.id == job["job_id"],
+            EnrichmentJob.claim_token == job["claim_token"]
+        )
+
+    @staticmethod
+    def _owned_todo(db: Session, job: Dict):
+        # SQLite 会复用已删除待办事项的id，同时按用户过滤
+        return db.query(TodoModel).filter(
+            TodoModel.id == job["todo_id"],
+            TodoModel.user_id == job["user_id"]
+        )
+
+    def _apply(self, job: Dict, analysis: Dict) -> Optional[int]:
+        """写回AI字段，返回新的 revision；待办事项已被删除时返回 None
+
+        先在同一事务中删除本次领取的任务行，删除不到说明待办事项在调用LLM期间被删除，
+        它的id可能已被其他待办事项复用，不再写回。
+        """
+        db = SessionLocal()
+        revision = None
+        try:
+            if not self._claimed(db, job).delete(synchronize_session=False):
+                db.rollback()
+                return None
+            todo = self._owned_todo(db, job).first()
+            if todo is not None:
+                if not job["keep_category"]:
+                    todo.category = analysis.get("category", "未分类")
+                if not job["keep_priority"]:
+                    todo.priority = analysis.get("priority", todo.priority)
+                todo.ai_generated_notes = analysis.get("suggestions", "")
+                todo.estimated_hours = float(analysis.get("estimated_hours", 1.0))
+                todo.priority_reasoning = analysis.get("reasoning", "")
+                todo.enrichment_status = "done"
+                revision = todo.revision = db.execute(bump_data_version(job["user_id"])).scalar_one()
+            db.commit()
+            return revision
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def retry_delay(self, attempts: int) -> timedelta:
+        """第 attempts 次失败后到下一次重试的等待时间"""
+        return timedelta(seconds=min(self.retry_base_seconds * 2 ** (attempts - 1), self.retry_max_seconds))
+
+    def _record_failure(self, job: Dict, error: str) -> Optional[int]:
+        """记录失败次数，未到上限时按指数退避安排下一次重试；超过上限时把待办事项标记为 failed 并返回新的 revision"""
+        db = SessionLocal()
+        revision = None
+        try:
+            db_job = self._claimed(db, job).first()
+            if db_job is None:
+                return None
+            db_job.attempts = (db_job.attempts or 0) + 1
+            db_job.last_error = error
+            if db_job.attempts >= self.max_attempts:
+                revision = db.execute(bump_data_version(job["user_id"])).scalar_one()
+                self._owned_todo(db, job).update(
+                    {"enrichment_status": "failed", "revision": revision}, synchronize_session=False
+                )
+                db.delete(db_job)
+            else:
+                db_job.status = "pending"
+                db_job.claim_token = None
+                db_job.next_attempt_at = datetime.utcnow() + self.retry_delay(db_job.attempts)
+            db.commit()
+            return revision
+        finally:
+            db.close()
+
+# 创建全局AI补充队列实例
+enrichment_worker = EnrichmentWorker()
@@ -0,0 +1,166 @@
+import os
+import time
+import json
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+Event = Dict
+Deliver = Callable[[Event], None]
+
+class Broker(ABC):
+    """事件代理接口：把事件发给所有 worker 进程
+
+    start 时传入 deliver，收到事件（包括本进程发布的）后在事件循环中调用 deliver 分发给本进程的订阅者。
+    多进程部署时可实现基于 Redis pub/sub 等的代理，替换 EventHub.broker；子类必须实现 publish，
+    订阅通过 start 传入的 deliver 完成，start/stop 需要建立或关闭连接时再覆盖。
+    """
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    @abstractmethod
+    async def publish(self, event: Event) -> None:
+        """把事件发给所有 worker 进程"""
+
+    async def stop(self) -> None:
+        pass
+
+class LocalBroker(Broker):
+    """进程内的代理，只分发给本进程的订阅者，适用于单个 worker"""
+
+    async def publish(self, event: Event) -> None:
+        self._deliver(event)
+
+class Subscription:
+    """一个事件流连接，事件放入有界队列，队列满时断开连接让客户端重新同步"""
+
+    def __init__(self, user_id: int, max_queue: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def put(self, event: Event) -> bool:
+        if self.overflowed:
+            return False
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            # 消费太慢：丢弃积压的事件，只留下 resync，客户端收到后用 GET /todos/changes 补齐
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync", "data": {}})
+            return False
+
+class EventHub:
+    """按用户分发的进程内发布/订阅中心，publish 可在任意线程调用"""
+
+    def __init__(self, broker: Optional[Broker] = None):
+        self.broker = broker or LocalBroker()
+        # 每个连接最多积压的事件数
+        self.max_queue = int(os.getenv("EVENT_QUEUE_SIZE", "100"))
+        # 没有事件时发送心跳的间隔（秒），同时用于及时发现已断开的连接
+        self.heartbeat = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+        # 单个连接的最长时间（秒），到期后由客户端自动重连；
+        # 服务关闭时会等待所有响应结束，避免长连接让关闭一直挂起
+        self.max_stream_seconds = float(os.getenv("EVENT_STREAM_MAX_SECONDS", "300"))
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._counters = {"published": 0, "delivered": 0, "overflowed": 0}
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        await self.broker.start(self._dispatch)
+        logger.info(f"事件中心已启动: broker={type(self.broker).__name__}")
+
+    async def stop(self) -> None:
+        await self.broker.stop()
+        self._loop = None
+
+    def publish(self, user_id: Optional[int], event_type: str, **data) -> None:
+        """发布事件，可在任意线程调用，立即返回"""
+        if user_id is None or self._loop is None:
+            return
+        event = {"type": event_type, "user_id": user_id, "data": data, "ts": time.time()}
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._publish(event)
+        else:
+            self._loop.call_soon_threadsafe(self._publish, event)
+
+    def _publish(self, event: Event) -> None:
+        self._counters["published"] += 1
+        task = self._loop.create_task(self.broker.publish(event))
+        task.add_done_callback(self._log_failure)
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"发布事件失败: {task.exception()}")
+
+    def _dispatch(self, event: Event) -> None:
+        for subscription in list(self._subscribers.get(event["user_id"], ())):
+            if subscription.put(event):
+                self._counters["delivered"] += 1
+            elif subscription.overflowed:
+                self._counters["overflowed"] += 1
+                self._remove(subscription)
+
+    def _remove(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.user_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.user_id]
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int):
+        subscription = Subscription(user_id, self.max_queue)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._remove(subscription)
+
+    async def stream(self, user_id: int, is_disconnected: Callable[[], Awaitable[bool]]):
+        """生成 text/event-stream 格式的事件流，没有事件时定期发送心跳注释"""
+        async with self.subscribe(user_id) as subscription:
+            # 断开后客户端 3 秒后重连
+            yield "retry: 3000\n\n"
+            deadline = time.monotonic() + self.max_stream_seconds
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=min(self.heartbeat, remaining)
+                    )
+                except asyncio.TimeoutError:
+                    if await is_disconnected():
+                        return
+                    yield ": ping\n\n"
+                    continue
+                payload = json.dumps(event["data"], ensure_ascii=False)
+                yield f"event: {event['type']}\ndata: {payload}\n\n"
+                if event["type"] == "resync":
+                    return
+
+    def stats(self) -> Dict:
+        return {
+            **self._counters,
+            "users": len(self._subscribers),
+            "connections": sum(len(subs) for subs in self._subscribers.values()),
+        }
+
+# 创建全局事件中心实例
+event_hub = EventHub()
@@ -0,0 +1,101 @@
+import os
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+class LLMClientConfig:
+    def __init__(self):
+        load_dotenv()
+        self.api_key = os.getenv("OPENAI_API_KEY")
+        self.api_base = os.getenv("OPENAI_API_BASE")
+        self.model = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+        # 单次调用超时（秒），包含排队等待并发名额的时间
+        self.timeout = float(os.getenv("LLM_TIMEOUT", "30"))
+        # 同一进程内同时进行的LLM请求上限
+        self.max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        # 共享连接池大小
+        self.max_connections = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+
+        if not self.api_key:
+            raise ValueError("OPENAI_API_KEY 环境变量未设置")
+        if not self.api_base:
+            raise ValueError("OPENAI_API_BASE 环境变量未设置")
+
+class LLMClient:
+    """异步LLM客户端：共享连接池、单次调用超时和并发上限"""
+
+    def __init__(self, config: Optional[LLMClientConfig] = None):
+        self._config = config
+        self._client = None
+        self._http_client = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def config(self) -> LLMClientConfig:
+        # 首次使用时才读取并校验环境变量，未配置LLM不影响应用启动
+        if self._config is None:
+            self._config = LLMClientConfig()
+        return self._config
+
+    def _get_client(self):
+        # 延迟创建，保证连接池绑定在运行中的事件循环上；openai/httpx 也在此时才导入
+        if self._client is None:
+            import httpx
+            from openai import AsyncOpenAI
+
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.config.max_connections,
+                    max_keepalive_connections=self.config.max_connections,
+                ),
+                timeout=self.config.timeout,
+            )
+            self._client = AsyncOpenAI(
+                api_key=self.config.api_key,
+                base_url=self.config.api_base,
+                http_client=self._http_client,
+                max_retries=0,
+            )
+        return self._client
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int = 300,
+        temperature: float = 0.7,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """发送一次对话请求并返回回复文本，超时抛出 asyncio.TimeoutError"""
+        timeout = timeout or self.config.timeout
+        return await asyncio.wait_for(
+            self._chat(messages, max_tokens, temperature, timeout),
+            timeout=timeout,
+        )
+
+    async def _chat(self, messages, max_tokens, temperature, timeout) -> str:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.config.max_concurrency)
+        async with self._semaphore:
+            response = await self._get_client().chat.completions.create(
+                model=self.config.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout,
+            )
+        return response.choices[0].message.content
+
+    async def aclose(self) -> None:
+        """关闭共享连接池"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            logger.info("LLM连接池已关闭")
+        self._client = None
+        self._http_client = None
+
+# 创建全局LLM客户端实例
+llm_client = LLMClient()
@@ -1,64 +1,152 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
 import numpy as np
+from scipy import sparse
 import joblib
 import os
-from datetime import datetime
+import time
+import shutil
+from datetime import datetime, timezone
 from models.todo import PriorityEnum
 import logging
-from typing import List, Optional, Any, Union
+from typing import List, NamedTuple, Optional, Any, Tuple
 
 logger = logging.getLogger(__name__)
 
+URGENT_KEYWORDS = ['紧急', '立即', '马上', 'urgent']
+
+def _to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """带时区的时间统一转换为UTC naive时间，与数据库中的存储方式一致"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+class ModelBundle(NamedTuple):
+    """一起加载、一起替换的模型和向量器，预测时整体读取一次，不会拿到新模型和旧向量器"""
+    model: Any
+    vectorizer: Any
+
 class TodoMLService:
-    def __init__(self):
-        self.vectorizer = TfidfVectorizer(max_features=1000)
-        self.model = RandomForestClassifier()
-        self.model_dir = "ml_models"
+    def __init__(self, model_dir: str = "ml_models", load: bool = True):
+        # full: 每次用全部数据重新训练随机森林；online: 哈希特征+增量学习，只学习新完成的数据
+        self.mode = os.getenv("ML_TRAINING_MODE", "full")
+        self.model_dir = model_dir
+        # 每次保存生成 versions/<version>/model.joblib，CURRENT 文件指向当前版本
+        self.versions_dir = os.path.join(self.model_dir, "versions")
+        self.current_path = os.path.join(self.model_dir, "CURRENT")
+        self.version: Optional[str] = None
+        self.keep_versions = int(os.getenv("ML_KEEP_VERSIONS", "3"))
+        # 检查是否有新版本的最小间隔（秒）
+        self.reload_interval = float(os.getenv("ML_RELOAD_CHECK_SECONDS", "5"))
+        self._last_reload_check = 0.0
+        # 旧版本的模型文件，仅用于兼容读取
         self.model_path = os.path.join(self.model_dir, "todo_priority_model.joblib")
         self.vectorizer_path = os.path.join(self.model_dir, "vectorizer.joblib")
+        self.checkpoint_path = os.path.join(self.model_dir, "online_checkpoint.joblib")
         self.min_samples_for_training = 20
-        
-        # 创建模型目录
-        os.makedirs(self.model_dir, exist_ok=True)
+        # 在线模式下已学习数据的高水位 (completed_at, id) 及累计样本数
+        self.watermark: Optional[Tuple[datetime, int]] = None
+        self.samples_seen = 0
+        self._reset_model()
         
         # 尝试加载现有模型
-        self.load_model()
+        if load:
+            self.load_model()
+
+    @property
+    def online(self) -> bool:
+        return self.mode == "online"
+
+    @property
+    def model(self) -> Any:
+        return self.bundle.model
+
+    @property
+    def vectorizer(self) -> Any:
+        return self.bundle.vectorizer
 
-    def prepare_features(self, todos: List[Any]) -> np.ndarray:
-        """准备特征数据"""
+    def _reset_model(self) -> None:
+        # sklearn 导入较慢，推迟到第一次创建模型时
+        from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.linear_model import SGDClassifier
+
+        if self.online:
+            # 哈希特征无需fit，字符n-gram对中文同样有效
+            self.bundle = ModelBundle(
+                model=SGDClassifier(loss="log_loss", random_state=42),
+                vectorizer=HashingVectorizer(
+                    n_features=2 ** 12,
+                    analyzer="char_wb",
+                    ngram_range=(1, 2),
+                    alternate_sign=False
+                )
+            )
+        else:
+            self.bundle = ModelBundle(
+                model=RandomForestClassifier(),
+                vectorizer=TfidfVectorizer(max_features=1000)
+            )
+
+    def prepare_features(self, todos: List[Any], fit: bool = False) -> sparse.csr_matrix:
+        """准备特征数据，fit=True 时先用这批文本拟合TF-IDF词表"""
+        return self.build_features(
+            [todo.text for todo in todos],
+            [todo.due_date for todo in todos],
+            fit=fit
+        )
+
+    def build_features(
+        self,
+        texts: List[str],
+        due_dates: List[Optional[datetime]],
+        fit: bool = False,
+        vectorizer: Any = None
+    ) -> sparse.csr_matrix:
+        """训练和预测共用的特征管道，全程保持稀疏矩阵；vectorizer 默认使用当前的向量器"""
+        vectorizer = vectorizer or self.vectorizer
         try:
-            texts = [todo.text for todo in todos]
-            features = self.vectorizer.transform(texts)
+            if fit and not self.online:
+                text_features = vectorizer.fit_transform(texts)
+            else:
+                text_features = vectorizer.transform(texts)
             
             # 添加额外特征
-            additional_features = np.array([
-                self._extract_additional_features(todo)
-                for todo in todos
-            ])
+            additional_features = self._extract_additional_features(texts, due_dates)
             
-            return np.hstack((features.toarray(), additional_features))
+            return sparse.hstack(
+                (text_features, sparse.csr_matrix(additional_features)),
+                format="csr"
+            )
         except Exception as e:
             logger.error(f"准备特征时发生错误: {str(e)}", exc_info=True)
             raise
 
-    def _extract_additional_features(self, todo: Any) -> List[Union[int, float]]:
-        """从待办事项中提取额外特征"""
-        try:
-            now = datetime.utcnow()
-            days_until_due = (todo.due_date - now).days if todo.due_date else 0
-            urgent_keywords = ['紧急', '立即', '马上', 'urgent']
-            
-            return [
-                1 if todo.due_date else 0,
-                days_until_due,
-                len(todo.text.split()),
-                1 if any(keyword in todo.text.lower() for keyword in urgent_keywords) else 0
-            ]
-        except Exception as e:
-            logger.error(f"提取额外特征时发生错误: {str(e)}", exc_info=True)
-            return [0, 0, 0, 0]
+    def _extract_additional_features(
+        self,
+        texts: List[str],
+        due_dates: List[Optional[datetime]]
+    ) -> np.ndarray:
+        """按列向量化计算额外特征：是否有截止日期、距截止天数、词数、是否含紧急关键词"""
+        text_array = np.array(texts, dtype=np.str_)
+        due = np.array([_to_naive_utc(d) for d in due_dates], dtype="datetime64[s]")
+        now = np.datetime64(datetime.utcnow(), "s")
+
+        has_due_date = ~np.isnat(due)
+        # 没有截止日期的行用0填充，避免对NaT做除法
+        time_until_due = np.where(has_due_date, due - now, np.timedelta64(0, "s"))
+        days_until_due = time_until_due // np.timedelta64(1, "D")
+        # 与 len(text.split()) 一致：连续的任意空白字符算一个分隔符，旧格式保存的模型按此训练
+        word_counts = np.fromiter((len(text.split()) for text in texts), dtype=np.int64, count=len(texts))
+        lowered = np.char.lower(text_array)
+        has_urgent_keyword = np.zeros(len(texts), dtype=bool)
+        for keyword in URGENT_KEYWORDS:
+            has_urgent_keyword |= np.char.find(lowered, keyword) >= 0
+
+        return np.column_stack((
+            has_due_date,
+            days_until_due,
+            word_counts,
+            has_urgent_keyword
+        )).astype(np.float64)
 
     def prepare_labels(self, todos: List[Any]) -> np.ndarray:
         """准备标签数据"""
@@ -79,9 +167,11 @@ class TodoMLService:
             logger.warning(f"训练样本数量不足: {len(todos)} < {self.min_samples_for_training}")
             return None
 
+        from sklearn.model_selection import train_test_split
+
         try:
             # 准备数据
-            X = self.prepare_features(todos)
+            X = self.prepare_features(todos, fit=True)
             y = self.prepare_labels(todos)
 
             # 分割训练集和测试集
@@ -104,31 +194,115 @@ class TodoMLService:
             logger.error(f"训练模型时发生错误: {str(e)}", exc_info=True)
             return None
 
+    def update_model(self, todos: List[Any]) -> Optional[float]:
+        """在线更新模型：todos 只需包含上次检查点之后新完成的待办事项"""
+        if not todos:
+            return None
+
+        try:
+            X = self.prepare_features(todos)
+            y = self.prepare_labels(todos)
+
+            # 渐进式验证：先用新数据评估旧模型，再学习
+            accuracy = self.model.score(X, y) if self.samples_seen > 0 else None
+            self.model.partial_fit(X, y, classes=np.array([0, 1, 2]))
+            if accuracy is None:
+                accuracy = self.model.score(X, y)
+
+            self.samples_seen += len(todos)
+            last = max(todos, key=lambda todo: (todo.completed_at, todo.id))
+            self.watermark = (last.completed_at, last.id)
+            self._save_checkpoint()
+
+            logger.info(f"模型增量更新完成: 新样本={len(todos)}, 累计样本={self.samples_seen}, 准确率: {accuracy:.2f}")
+            return accuracy
+
+        except Exception as e:
+            logger.error(f"增量更新模型时发生错误: {str(e)}", exc_info=True)
+            return None
+
+    def _save_checkpoint(self) -> None:
+        """保存在线模型及已学习数据的高水位"""
+        self._save_version({
+            "mode": "online",
+            "model": self.model,
+            "watermark": self.watermark,
+            "samples_seen": self.samples_seen,
+        })
+
     def _save_model(self) -> None:
         """保存模型和向量器"""
+        self._save_version({
+            "mode": "full",
+            "model": self.model,
+            "vectorizer": self.vectorizer,
+        })
+
+    def _save_version(self, bundle: dict) -> None:
+        """写入新版本目录后原子地切换 CURRENT，读取方不会读到不一致的模型和向量器"""
         try:
-            joblib.dump(self.model, self.model_path)
-            joblib.dump(self.vectorizer, self.vectorizer_path)
-            logger.info("模型保存成功")
+            version = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}-{os.getpid()}"
+            version_dir = os.path.join(self.versions_dir, version)
+            os.makedirs(version_dir, exist_ok=True)
+            joblib.dump(bundle, os.path.join(version_dir, "model.joblib"))
+
+            tmp_path = f"{self.current_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(version)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.current_path)
+            self.version = version
+            logger.info(f"模型保存成功: version={version}")
         except Exception as e:
             logger.error(f"保存模型时发生错误: {str(e)}", exc_info=True)
             raise
+        self._prune_versions()
+
+    def _prune_versions(self) -> None:
+        """只保留最近的几个版本；已被其他进程映射的文件删除后仍可继续读取"""
+        try:
+            versions = sorted(os.listdir(self.versions_dir))
+            for version in versions[:-self.keep_versions]:
+                if version != self.version:
+                    shutil.rmtree(os.path.join(self.versions_dir, version), ignore_errors=True)
+        except OSError as e:
+            logger.warning(f"清理旧模型版本失败: {str(e)}")
+
+    def _read_current_version(self) -> Optional[str]:
+        try:
+            with open(self.current_path) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
 
     def predict_priority(self, todo_text: str, due_date: Optional[datetime] = None) -> PriorityEnum:
         """预测任务优先级"""
+        result = self.predict_priority_batch([todo_text], [due_date])[0]
+        logger.info(f"预测完成: text='{todo_text[:50]}...', priority={result}")
+        return result
+
+    def predict_priority_batch(
+        self,
+        texts: List[str],
+        due_dates: Optional[List[Optional[datetime]]] = None
+    ) -> List[PriorityEnum]:
+        """批量预测任务优先级：一次特征转换、一次模型预测"""
+        if due_dates is None:
+            due_dates = [None] * len(texts)
+        if not texts:
+            return []
+        if self.online and self.samples_seen < self.min_samples_for_training:
+            return [PriorityEnum.MEDIUM] * len(texts)
+
+        # 热加载可能在其他线程中替换 bundle，这里只读取一次
+        model, vectorizer = self.bundle
         try:
             # 准备特征
-            text_features = self.vectorizer.transform([todo_text]).toarray()
-            additional_features = np.array([[
-                1 if due_date else 0,
-                (due_date - datetime.utcnow()).days if due_date else 0,
-                len(todo_text.split()),
-                1 if any(keyword in todo_text.lower() for keyword in ['紧急', '立即', '马上', 'urgent']) else 0
-            ]])
-            features = np.hstack((text_features, additional_features))
+            features = self.build_features(texts, due_dates, vectorizer=vectorizer)
 
             # 预测
-            prediction = self.model.predict(features)[0]
+            predictions = model.predict(features)
             
             # 转换预测结果
             priority_map = {
@@ -136,25 +310,83 @@ class TodoMLService:
                 1: PriorityEnum.MEDIUM,
                 2: PriorityEnum.HIGH
             }
-            result = priority_map[prediction]
-            logger.info(f"预测完成: text='{todo_text[:50]}...', priority={result}")
-            return result
+            return [priority_map[prediction] for prediction in predictions]
             
         except Exception as e:
             logger.error(f"预测优先级时发生错误: {str(e)}", exc_info=True)
-            return PriorityEnum.MEDIUM
+            return [PriorityEnum.MEDIUM] * len(texts)
 
     def load_model(self) -> bool:
-        """加载已保存的模型"""
+        """加载已保存的模型，模型和向量器一次性替换"""
         try:
-            if os.path.exists(self.model_path) and os.path.exists(self.vectorizer_path):
-                self.model = joblib.load(self.model_path)
-                self.vectorizer = joblib.load(self.vectorizer_path)
-                logger.info("成功加载已有模型")
+            version = self._read_current_version()
+            if version is not None:
+                bundle = joblib.load(os.path.join(self.versions_dir, version, "model.joblib"))
+                if bundle["mode"] != self.mode:
+                    logger.warning(f"模型类型与当前模式不一致: {bundle['mode']} != {self.mode}")
+                    return False
+                if self.online:
+                    self.watermark = bundle["watermark"]
+                    self.samples_seen = bundle["samples_seen"]
+                self.bundle = ModelBundle(
+                    model=bundle["model"],
+                    vectorizer=self.vectorizer if self.online else bundle["vectorizer"]
+                )
+                self.version = version
+                logger.info(f"成功加载模型: dir={self.model_dir}, version={version}")
                 return True
+            return self._load_legacy_model()
         except Exception as e:
             logger.error(f"加载模型时发生错误: {str(e)}", exc_info=True)
         return False
 
-# 创建全局ML服务实例
-ml_service = TodoMLService() 
\ No newline at end of file
+    def _load_legacy_model(self) -> bool:
+        """读取引入版本目录之前保存的模型文件"""
+        if self.online:
+            if os.path.exists(self.checkpoint_path):
+                checkpoint = joblib.load(self.checkpoint_path)
+                self.bundle = self.bundle._replace(model=checkpoint["model"])
+                self.watermark = checkpoint["watermark"]
+                self.samples_seen = checkpoint["samples_seen"]
+                logger.info(f"成功加载在线模型检查点: 累计样本={self.samples_seen}")
+                return True
+            return False
+        if os.path.exists(self.model_path) and os.path.exists(self.vectorizer_path):
+            self.bundle = ModelBundle(
+                model=joblib.load(self.model_path),
+                vectorizer=joblib.load(self.vectorizer_path)
+            )
+            logger.info("成功加载已有模型")
+            return True
+        return False
+
+    @property
+    def reload_due(self) -> bool:
+        """距上次检查新版本已超过 reload_interval，下次 reload_if_changed 会读取磁盘"""
+        return time.monotonic() - self._last_reload_check >= self.reload_interval
+
+    def reload_if_changed(self, force: bool = False) -> bool:
+        """CURRENT 指向新版本时热加载，检查频率受 reload_interval 限制"""
+        now = time.monotonic()
+        if not force and now - self._last_reload_check < self.reload_interval:
+            return False
+        self._last_reload_check = now
+        version = self._read_current_version()
+        if version is None or version == self.version:
+            return False
+        return self.load_model()
+
+    def has_saved_model(self) -> bool:
+        """模型目录中是否已有训练好的模型"""
+        if os.path.exists(self.current_path):
+            return True
+        if self.online:
+            return os.path.exists(self.checkpoint_path)
+        return os.path.exists(self.model_path) and os.path.exists(self.vectorizer_path)
+
+    def artifact_bytes(self) -> int:
+        """模型文件大小，用于估算加载后的内存占用"""
+        if self.version is not None:
+            return os.path.getsize(os.path.join(self.versions_dir, self.version, "model.joblib"))
+        paths = [self.checkpoint_path] if self.online else [self.model_path, self.vectorizer_path]
+        return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
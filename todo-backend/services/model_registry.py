@@ -0,0 +1,157 @@
+import os
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from .ml_service import TodoMLService
+
+logger = logging.getLogger(__name__)
+
+class ModelRegistry:
+    """按用户管理优先级模型：有个人模型的用户使用自己的模型，其余用户回退到全局模型
+
+    个人模型保存在 ml_models/<user_id>/，内存中只保留最近使用的一部分，
+    按数量和模型文件大小做LRU淘汰。已加载的模型在磁盘上出现新版本时自动热加载。
+    """
+
+    def __init__(self, base_dir: str = "ml_models"):
+        self.base_dir = base_dir
+        self.max_models = int(os.getenv("ML_REGISTRY_MAX_MODELS", "100"))
+        self.max_bytes = int(os.getenv("ML_REGISTRY_MAX_BYTES", str(256 * 1024 * 1024)))
+        self._global_model: Optional[TodoMLService] = None
+        # 全局模型加载完成后置为 True，供 /readyz 使用
+        self.ready = False
+        self._models: "OrderedDict[int, Tuple[TodoMLService, int]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        # 事件循环中正在进行的加载，同一用户的并发请求共用一次加载
+        self._inflight: Dict[Optional[int], asyncio.Future] = {}
+
+    @property
+    def global_model(self) -> TodoMLService:
+        # 延迟创建：导入本模块时不加载sklearn和模型文件
+        if self._global_model is None:
+            self._global_model = TodoMLService(model_dir=self.base_dir, load=False)
+        return self._global_model
+
+    def warm_up(self) -> None:
+        """加载全局模型，应用启动后在后台调用"""
+        self.global_model.reload_if_changed(force=True)
+        self.ready = True
+        logger.info("全局模型加载完成")
+
+    @property
+    def min_samples_for_training(self) -> int:
+        return self.global_model.min_samples_for_training
+
+    def model_dir(self, user_id: Optional[int]) -> str:
+        """user_id 为 None 时返回全局模型目录"""
+        if user_id is None:
+            return self.base_dir
+        return os.path.join(self.base_dir, str(user_id))
+
+    def get(self, user_id: Optional[int]) -> TodoMLService:
+        """获取用户的模型，没有个人模型时返回全局模型"""
+        if user_id is None:
+            self.global_model.reload_if_changed()
+            return self.global_model
+
+        with self._lock:
+            entry = self._models.get(user_id)
+            if entry is not None:
+                self._models.move_to_end(user_id)
+        if entry is not None:
+            service, size = entry
+            # 其他进程训练出新版本时热加载
+            if service.reload_if_changed():
+                self._resize(user_id, service.artifact_bytes())
+            return service
+
+        service = TodoMLService(model_dir=self.model_dir(user_id), load=False)
+        if not service.has_saved_model() or not service.load_model():
+            return self.global_model
+
+        size = service.artifact_bytes()
+        with self._lock:
+            # 并发加载时以先放入的为准
+            entry = self._models.get(user_id)
+            if entry is not None:
+                return entry[0]
+            self._models[user_id] = (service, size)
+            self._total_bytes += size
+            self._evict()
+        return service
+
+    def _cached(self, user_id: Optional[int]) -> Optional[TodoMLService]:
+        """已在内存中且还不需要检查新版本的模型，不访问磁盘；否则返回 None"""
+        if user_id is None:
+            service = self._global_model
+        else:
+            with self._lock:
+                entry = self._models.get(user_id)
+                if entry is not None:
+                    self._models.move_to_end(user_id)
+            service = entry[0] if entry is not None else None
+        if service is None or service.reload_due:
+            return None
+        return service
+
+    async def get_async(self, user_id: Optional[int]) -> TodoMLService:
+        """在事件循环中获取模型：已加载的模型直接返回，需要读取磁盘时在线程中执行 get
+
+        同一用户的并发请求只触发一次加载，其余请求等待同一结果。
+        """
+        service = self._cached(user_id)
+        if service is not None:
+            return service
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.get(user_id)
+        if inflight is None or inflight.get_loop() is not loop:
+            inflight = loop.create_task(asyncio.to_thread(self.get, user_id))
+            self._inflight[user_id] = inflight
+            inflight.add_done_callback(lambda task: self._finish_load(user_id, task))
+        return await asyncio.shield(inflight)
+
+    def _finish_load(self, user_id: Optional[int], task: asyncio.Future) -> None:
+        if self._inflight.get(user_id) is task:
+            del self._inflight[user_id]
+
+    def invalidate(self, user_id: Optional[int]) -> None:
+        """模型重新训练后调用，立即切换到新版本"""
+        if user_id is None:
+            self.global_model.reload_if_changed(force=True)
+            return
+        with self._lock:
+            entry = self._models.get(user_id)
+        if entry is not None and entry[0].reload_if_changed(force=True):
+            self._resize(user_id, entry[0].artifact_bytes())
+
+    def _resize(self, user_id: int, size: int) -> None:
+        with self._lock:
+            entry = self._models.get(user_id)
+            if entry is None:
+                return
+            self._total_bytes += size - entry[1]
+            self._models[user_id] = (entry[0], size)
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._models and (
+            len(self._models) > self.max_models or self._total_bytes > self.max_bytes
+        ):
+            user_id, (_, size) = self._models.popitem(last=False)
+            self._total_bytes -= size
+            logger.info(f"从内存中移除用户模型: user_id={user_id}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded_models": len(self._models),
+                "loaded_bytes": self._total_bytes,
+                "max_models": self.max_models,
+                "max_bytes": self.max_bytes,
+            }
+
+# 创建全局模型注册表实例
+model_registry = ModelRegistry()
@@ -0,0 +1,95 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.user import User
+
+logger = logging.getLogger(__name__)
+
+# 浏览器每次使用前都要带 If-None-Match 重新验证，且只能缓存在本地
+CACHE_CONTROL = "private, no-cache"
+
+def bump_data_version(user_id: int):
+    """返回把用户数据版本加一并返回新版本的语句，在写入待办事项的同一事务中执行
+
+    新版本同时作为本次写入的待办事项 revision，用于增量同步。
+    """
+    return (
+        update(User).where(User.id == user_id)
+        .values(data_version=User.data_version + 1)
+        .returning(User.data_version)
+    )
+
+async def get_data_version(db: AsyncSession, user_id: int) -> int:
+    return await db.scalar(select(User.data_version).where(User.id == user_id)) or 0
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 使用弱比较，忽略 W/ 前缀"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+class ResponseCache:
+    """已序列化的列表响应缓存，key 为 (用户, 数据版本, 路径, 查询参数)
+
+    写入会增加数据版本，旧版本的条目不会再被命中，按LRU自然淘汰。
+    """
+
+    def __init__(self):
+        self.max_entries = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+        self._entries: "OrderedDict[str, Tuple[bytes, Dict[str, str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "not_modified": 0}
+
+    @staticmethod
+    def make_key(user_id: int, version: int, path: str, params: Iterable[Tuple[str, str]]) -> str:
+        query = "&".join(f"{k}={v}" for k, v in sorted(params))
+        return f"{user_id}:{version}:{path}?{query}"
+
+    @staticmethod
+    def etag(key: str) -> str:
+        return '"' + hashlib.sha1(key.encode()).hexdigest()[:24] + '"'
+
+    @staticmethod
+    def serialize(content) -> bytes:
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def get(self, key: str) -> Optional[Tuple[bytes, Dict[str, str]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry
+
+    def set(self, key: str, body: bytes, headers: Dict[str, str]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (body, headers)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self._counters["not_modified"] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+# 创建全局响应缓存实例
+response_cache = ResponseCache()
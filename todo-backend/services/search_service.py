@@ -0,0 +1,142 @@
+import re
+import logging
+from typing import List, Optional
+from sqlalchemy import inspect, or_, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.todo import TodoModel
+
+logger = logging.getLogger(__name__)
+
+# trigram 分词至少需要3个字符才能匹配，更短的关键词使用二元组索引
+MIN_FTS_TERM_LENGTH = 3
+
+# 二元组索引：每个位置开始的两个字符作为一个词元（最后一个位置为单个字符），
+# 由触发器借助 search_positions 序号表生成；每列只索引前 MAX_BIGRAM_POSITIONS 个位置
+BIGRAM_TABLE = "todos_fts_bigram"
+POSITIONS_TABLE = "search_positions"
+MAX_BIGRAM_POSITIONS = 4096
+
+# bm25 各列权重：text, ai_generated_notes, category
+_BM25_WEIGHTS = "10.0, 2.0, 5.0"
+
+def bigram_expression(column: str) -> str:
+    """把一列拆成以空格分隔的二元组的 SQL 表达式，用于触发器和重建索引"""
+    return (
+        f"(SELECT group_concat(substr({column}, n, 2), ' ') FROM {POSITIONS_TABLE} "
+        f"WHERE n <= length({column}))"
+    )
+
+class TodoSearchService:
+    """待办事项搜索：SQLite FTS5 按 bm25 排序，3个字符及以上的关键词使用 trigram 索引，
+    1-2 个字符的关键词使用二元组索引；索引不可用或关键词含标点时退回 LIKE"""
+
+    FTS_TABLE = "todos_fts"
+
+    def __init__(self):
+        self._fts_available: Optional[bool] = None
+
+    async def fts_available(self, db: AsyncSession) -> bool:
+        if self._fts_available is None:
+            conn = await db.connection()
+            self._fts_available = await conn.run_sync(
+                lambda sync_conn: all(
+                    inspect(sync_conn).has_table(table) for table in (self.FTS_TABLE, BIGRAM_TABLE)
+                )
+            )
+        return self._fts_available
+
+    @staticmethod
+    def split_terms(query: str) -> List[str]:
+        return [term for term in re.split(r"\s+", query.strip()) if term]
+
+    @staticmethod
+    def build_match(terms: List[str]) -> str:
+        # 每个关键词作为短语匹配，避免用户输入被解析为FTS语法
+        return " AND ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+    @staticmethod
+    def build_bigram_match(terms: List[str]) -> str:
+        # 两个字符的关键词正好是一个词元；单个字符匹配以它开头的词元
+        return " AND ".join(f'"{term}"' + ("*" if len(term) == 1 else "") for term in terms)
+
+    @staticmethod
+    def bigram_searchable(term: str) -> bool:
+        """unicode61 分词会在标点处切开，含标点的短关键词无法用二元组索引精确匹配"""
+        return term.isalnum()
+
+    async def search(
+        self, db: AsyncSession, user_id: int, query: str, limit: int, offset: int
+    ) -> List[TodoModel]:
+        """按相关度返回用户的待办事项，多个关键词之间为 AND 关系"""
+        terms = self.split_terms(query)
+        if not terms:
+            return []
+        long_terms = [term for term in terms if len(term) >= MIN_FTS_TERM_LENGTH]
+        short_terms = [term for term in terms if len(term) < MIN_FTS_TERM_LENGTH]
+        if all(self.bigram_searchable(term) for term in short_terms) and await self.fts_available(db):
+            return await self._search_fts(db, user_id, long_terms, short_terms, limit, offset)
+        return await self._search_like(db, user_id, terms, limit, offset)
+
+    async def _search_fts(self, db, user_id, long_terms, short_terms, limit, offset) -> List[TodoModel]:
+        """长关键词查 trigram 索引、短关键词查二元组索引，两边的结果取交集并按 bm25 之和排序"""
+        matches = []
+        if long_terms:
+            matches.append((self.FTS_TABLE, self.build_match(long_terms)))
+        if short_terms:
+            matches.append((BIGRAM_TABLE, self.build_bigram_match(short_terms)))
+        joins = " ".join(
+            f"JOIN (SELECT rowid, bm25({table}, {_BM25_WEIGHTS}) AS rank FROM {table} "
+            f"WHERE {table} MATCH :match{idx}) AS m{idx} ON m{idx}.rowid = todos.id"
+            for idx, (table, _) in enumerate(matches)
+        )
+        rank = " + ".join(f"m{idx}.rank" for idx in range(len(matches)))
+        statement = text(
+            f"SELECT todos.* FROM todos {joins} "
+            f"WHERE todos.user_id = :user_id "
+            f"ORDER BY {rank}, todos.id "
+            "LIMIT :limit OFFSET :offset"
+        ).bindparams(
+            user_id=user_id, limit=limit, offset=offset,
+            **{f"match{idx}": match for idx, (_, match) in enumerate(matches)}
+        )
+        result = await db.execute(select(TodoModel).from_statement(statement))
+        return list(result.scalars().all())
+
+    async def _search_like(self, db, user_id, terms, limit, offset) -> List[TodoModel]:
+        query = select(TodoModel).where(TodoModel.user_id == user_id)
+        for term in terms:
+            query = query.where(or_(
+                TodoModel.text.contains(term, autoescape=True),
+                TodoModel.ai_generated_notes.contains(term, autoescape=True),
+                TodoModel.category.contains(term, autoescape=True),
+            ))
+        query = query.order_by(TodoModel.created_at.desc(), TodoModel.id.desc())
+        result = await db.execute(query.limit(limit).offset(offset))
+        return list(result.scalars().all())
+
+    def rebuild(self, bind: Engine) -> bool:
+        """根据 todos 表重建全文索引并合并索引段，索引不存在时返回 False"""
+        with bind.begin() as conn:
+            inspector = inspect(conn)
+            if not inspector.has_table(self.FTS_TABLE) or not inspector.has_table(BIGRAM_TABLE):
+                return False
+            conn.execute(text(f"INSERT INTO {self.FTS_TABLE}({self.FTS_TABLE}) VALUES ('rebuild')"))
+            conn.execute(text(f"INSERT INTO {self.FTS_TABLE}({self.FTS_TABLE}) VALUES ('optimize')"))
+            # 二元组索引不是外部内容表，清空后重新生成
+            conn.execute(text(f"DELETE FROM {BIGRAM_TABLE}"))
+            conn.execute(text(self.bigram_backfill_sql()))
+            conn.execute(text(f"INSERT INTO {BIGRAM_TABLE}({BIGRAM_TABLE}) VALUES ('optimize')"))
+        logger.info("全文搜索索引已重建")
+        return True
+
+    @staticmethod
+    def bigram_backfill_sql() -> str:
+        return (
+            f"INSERT INTO {BIGRAM_TABLE}(rowid, text, ai_generated_notes, category) "
+            f"SELECT id, {bigram_expression('todos.text')}, {bigram_expression('todos.ai_generated_notes')}, "
+            f"{bigram_expression('todos.category')} FROM todos"
+        )
+
+# 创建全局搜索服务实例
+search_service = TodoSearchService()
@@ -0,0 +1,80 @@
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.todo import TodoModel
+from models.stats import STATS_CONTRIBUTIONS, UserCategoryStats, UserTodoStats
+
+logger = logging.getLogger(__name__)
+
+class TodoStatsService:
+    """读取按用户预先汇总的统计，汇总表由迁移 6 创建的触发器维护；触发器不存在时（非 SQLite）退回实时聚合查询"""
+
+    TRIGGER = "todos_stats_insert"
+
+    def __init__(self):
+        self._available: Optional[bool] = None
+
+    async def available(self, db: AsyncSession) -> bool:
+        if self._available is None:
+            conn = await db.connection()
+            self._available = conn.dialect.name == "sqlite" and bool(await conn.scalar(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = :name"
+            ).bindparams(name=self.TRIGGER)))
+        return self._available
+
+    async def summary(self, db: AsyncSession, user_id: int) -> Dict:
+        """返回 user_todo_stats 各列的值"""
+        if await self.available(db):
+            row = await db.get(UserTodoStats, user_id)
+            return {column: getattr(row, column) if row else 0 for column in STATS_CONTRIBUTIONS}
+        sums = ", ".join(
+            f"coalesce(sum({expr.format(row='todos')}), 0) AS {column}"
+            for column, expr in STATS_CONTRIBUTIONS.items()
+        )
+        result = await db.execute(
+            text(f"SELECT {sums} FROM todos WHERE user_id = :user_id").bindparams(user_id=user_id)
+        )
+        return dict(result.mappings().one())
+
+    async def completed_count(self, db: AsyncSession, user_id: int) -> int:
+        if await self.available(db):
+            return await db.scalar(
+                select(UserTodoStats.completed_count).where(UserTodoStats.user_id == user_id)
+            ) or 0
+        return await db.scalar(select(func.count()).select_from(TodoModel).where(
+            TodoModel.user_id == user_id,
+            TodoModel.completed == True
+        ))
+
+    async def categories(self, db: AsyncSession, user_id: int) -> List[Dict]:
+        """按分类名称返回 [{"category", "total", "completed"}]，不包括未设置分类的待办事项"""
+        if await self.available(db):
+            query = select(
+                UserCategoryStats.category,
+                UserCategoryStats.total_count,
+                UserCategoryStats.completed_count
+            ).where(UserCategoryStats.user_id == user_id, UserCategoryStats.total_count > 0)
+        else:
+            query = select(
+                TodoModel.category,
+                func.count(),
+                func.count().filter(TodoModel.completed == True)
+            ).where(TodoModel.user_id == user_id).group_by(TodoModel.category)
+        result = await db.execute(query.order_by(query.selected_columns[0]))
+        return [
+            {"category": category, "total": total, "completed": completed}
+            for category, total, completed in result if category
+        ]
+
+    async def overdue_count(self, db: AsyncSession, user_id: int, now: Optional[datetime] = None) -> int:
+        """未完成且已过截止时间的数量；随时间变化，不能由触发器维护，走 (user_id, completed, due_date) 索引"""
+        return await db.scalar(select(func.count()).select_from(TodoModel).where(
+            TodoModel.user_id == user_id,
+            TodoModel.completed == False,
+            TodoModel.due_date < (now or datetime.now())
+        ))
+
+# 创建全局统计服务实例
+stats_service = TodoStatsService()
@@ -0,0 +1,180 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TRAILING_PUNCTUATION = " .,!?;:。，！？、；：…~～"
+
+def normalize_text(text: str) -> str:
+    """统一全半角、大小写和空白，使同一任务的不同写法命中同一缓存"""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(_TRAILING_PUNCTUATION)
+
+def due_date_bucket(due_date: Optional[datetime], now: Optional[datetime] = None) -> str:
+    """把截止日期归到粗粒度区间，避免精确时间导致缓存无法复用"""
+    if due_date is None:
+        return "none"
+    now = now or datetime.utcnow()
+    if due_date.tzinfo is not None:
+        due_date = due_date.replace(tzinfo=None)
+    days = (due_date - now).days
+    if days < 0:
+        return "overdue"
+    for limit, name in ((0, "today"), (1, "1d"), (3, "3d"), (7, "7d"), (30, "30d")):
+        if days <= limit:
+            return name
+    return "later"
+
+class SuggestionCache:
+    """AI建议缓存：内存LRU+TTL，可选SQLite磁盘层，并对相同请求做single-flight合并"""
+
+    def __init__(self):
+        self.max_entries = int(os.getenv("SUGGESTION_CACHE_SIZE", "1024"))
+        self.ttl = float(os.getenv("SUGGESTION_CACHE_TTL", str(7 * 24 * 3600)))
+        # 未设置时只使用内存缓存
+        self.db_path = os.getenv("SUGGESTION_CACHE_DB")
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._counters = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    @staticmethod
+    def make_key(text: str, due_date: Optional[datetime], ml_priority: str) -> str:
+        # 提示词包含模型预测的优先级，因此也作为key的一部分
+        priority = getattr(ml_priority, "value", ml_priority)
+        return f"{normalize_text(text)}|{due_date_bucket(due_date)}|{priority}"
+
+    def stats(self) -> Dict:
+        return {
+            **self._counters,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "inflight": len(self._inflight),
+            "disk_enabled": bool(self.db_path),
+        }
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Dict]]) -> Dict:
+        """命中缓存直接返回；否则同一key只发起一次compute，其余调用等待同一结果"""
+        value = self._get_memory(key)
+        if value is not None:
+            self._counters["hits"] += 1
+            return dict(value)
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._counters["coalesced"] += 1
+            return dict(await asyncio.shield(inflight))
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._get_disk(key)
+            if value is not None:
+                self._counters["disk_hits"] += 1
+            else:
+                self._counters["misses"] += 1
+                value = await compute()
+                await self._put_disk(key, value)
+            self._put_memory(key, value)
+            future.set_result(value)
+            return dict(value)
+        except Exception as e:
+            future.set_exception(e)
+            # 避免没有等待者时出现 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def _get_memory(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            self._counters["expirations"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _put_memory(self, key: str, value: Dict) -> None:
+        self._entries[key] = (time.time() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS suggestion_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS ix_suggestion_cache_expires_at ON suggestion_cache (expires_at)"
+            )
+            self._db.commit()
+        return self._db
+
+    async def _get_disk(self, key: str) -> Optional[Dict]:
+        if not self.db_path:
+            return None
+        try:
+            return await asyncio.to_thread(self._read_disk, key)
+        except Exception as e:
+            logger.error(f"读取建议缓存失败: {str(e)}")
+            return None
+
+    def _read_disk(self, key: str) -> Optional[Dict]:
+        with self._db_lock:
+            row = self._connect().execute(
+                "SELECT value FROM suggestion_cache WHERE key = ? AND expires_at >= ?",
+                (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def _put_disk(self, key: str, value: Dict) -> None:
+        if not self.db_path:
+            return
+        try:
+            await asyncio.to_thread(self._write_disk, key, value)
+        except Exception as e:
+            logger.error(f"写入建议缓存失败: {str(e)}")
+
+    def _write_disk(self, key: str, value: Dict) -> None:
+        now = time.time()
+        with self._db_lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO suggestion_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now + self.ttl)
+            )
+            db.execute("DELETE FROM suggestion_cache WHERE expires_at < ?", (now,))
+            db.commit()
+
+# 创建全局建议缓存实例
+suggestion_cache = SuggestionCache()
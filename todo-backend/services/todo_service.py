@@ -1,17 +1,8 @@
 from typing import List, Optional
 from datetime import datetime
 from schemas.todo import TodoCreate, TodoResponse, TodoAnalysis, TodoStep
-import openai
+from .llm_client import llm_client
 import json
-import os
-from dotenv import load_dotenv
-
-# 加载环境变量
-load_dotenv()
-
-# 设置OpenAI API密钥
-openai.api_key = os.getenv('OPENAI_API_KEY')
-openai.api_base = os.getenv('OPENAI_API_BASE')
 
 async def generate_todo_suggestions(todo: TodoCreate) -> TodoAnalysis:
     try:
@@ -38,8 +29,7 @@ async def generate_todo_suggestions(todo: TodoCreate) -> TodoAnalysis:
             todo.due_date if todo.due_date else '未设置'
         )
 
-        response = await openai.ChatCompletion.acreate(
-            model=os.getenv('OPENAI_MODEL'),
+        content = await llm_client.chat(
             messages=[
                 {"role": "system", "content": "你是一个任务管理助手，帮助用户分析和规划任务。"},
                 {"role": "user", "content": prompt}
@@ -49,7 +39,7 @@ async def generate_todo_suggestions(todo: TodoCreate) -> TodoAnalysis:
         )
 
         # 解析AI响应
-        result = json.loads(response.choices[0].message.content)
+        result = json.loads(content)
         
         # 创建任务步骤
         steps = [
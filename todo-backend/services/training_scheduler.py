@@ -0,0 +1,151 @@
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+from sqlalchemy import and_, or_
+from database.database import SessionLocal
+from models.todo import TodoModel
+# 训练子进程不会导入 main，需要在这里注册 User，TodoModel.user 关系才能初始化
+from models.user import User  # noqa: F401
+from .ml_service import TodoMLService
+from .model_registry import model_registry
+from .event_hub import event_hub
+
+logger = logging.getLogger(__name__)
+
+def _train_user_model(user_id: Optional[int]) -> Optional[float]:
+    """在训练子进程中执行：用独立的数据库会话读取数据，训练并保存模型
+
+    user_id 为 None 时使用所有用户的数据训练全局模型。
+    """
+    service = TodoMLService(model_dir=model_registry.model_dir(user_id), load=False)
+    db = SessionLocal()
+    try:
+        query = db.query(TodoModel).filter(TodoModel.completed == True)
+        if user_id is not None:
+            query = query.filter(TodoModel.user_id == user_id)
+        if service.online:
+            return _update_online_model(service, query)
+        todos = query.all()
+    finally:
+        db.close()
+    if not todos:
+        return None
+    return service.train_model(todos)
+
+def _update_online_model(service: TodoMLService, query) -> Optional[float]:
+    """在线模式：只读取检查点高水位之后新完成的待办事项"""
+    service.load_model()
+    query = query.filter(TodoModel.completed_at.isnot(None))
+    if service.watermark is not None:
+        completed_at, todo_id = service.watermark
+        query = query.filter(or_(
+            TodoModel.completed_at > completed_at,
+            and_(TodoModel.completed_at == completed_at, TodoModel.id > todo_id)
+        ))
+    todos = query.order_by(TodoModel.completed_at, TodoModel.id).all()
+    return service.update_model(todos)
+
+class TrainingScheduler:
+    """合并训练请求：同一用户的多次触发只训练一次，同一时间只运行一个训练任务
+
+    每次触发同时登记用户的个人模型和全局模型（key 为 None）。
+    """
+
+    def __init__(self):
+        # 最后一次触发后等待的时间，期间的新触发会被合并
+        self.debounce = float(os.getenv("TRAINING_DEBOUNCE_SECONDS", "10"))
+        # 同一用户两次训练之间的最小间隔
+        self.min_interval = float(os.getenv("TRAINING_MIN_INTERVAL_SECONDS", "60"))
+        self._pending: Dict[Optional[int], float] = {}
+        self._last_run: Dict[Optional[int], float] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._stopped = False
+
+    def schedule(self, user_id: int) -> None:
+        """登记一次训练请求，可在任意线程调用，立即返回"""
+        with self._cond:
+            now = time.monotonic()
+            self._pending[user_id] = now
+            self._pending[None] = now
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped = False
+                self._thread = threading.Thread(
+                    target=self._loop, name="training-scheduler", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+
+    def shutdown(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._executor = None
+
+    def _ready_at(self, user_id: Optional[int]) -> float:
+        return max(
+            self._pending[user_id] + self.debounce,
+            self._last_run.get(user_id, float("-inf")) + self.min_interval
+        )
+
+    def _next_user(self) -> Tuple[bool, Optional[int]]:
+        """阻塞直到有训练请求到期，返回 (是否继续运行, user_id)"""
+        with self._cond:
+            while not self._stopped:
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                user_id = min(self._pending, key=self._ready_at)
+                delay = self._ready_at(user_id) - time.monotonic()
+                if delay <= 0:
+                    del self._pending[user_id]
+                    return True, user_id
+                self._cond.wait(delay)
+            return False, None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # 训练在独立进程中进行，不与请求处理争抢GIL
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _loop(self) -> None:
+        while True:
+            running, user_id = self._next_user()
+            if not running:
+                return
+            self._last_run[user_id] = time.monotonic()
+            try:
+                accuracy = self._get_executor().submit(_train_user_model, user_id).result()
+                if accuracy is not None:
+                    self._on_trained(user_id, accuracy)
+            except BrokenProcessPool:
+                # 训练子进程异常退出，下次训练时重新创建进程池
+                logger.error(f"训练子进程异常退出: user_id={user_id}")
+                self._executor = None
+            except Exception as e:
+                logger.error(f"训练任务失败: user_id={user_id}, error={str(e)}", exc_info=True)
+
+    def _on_trained(self, user_id: Optional[int], accuracy: float) -> None:
+        # 子进程已保存新模型，当前进程下次使用时重新加载
+        model_registry.invalidate(user_id)
+        # 全局模型（user_id 为 None）不通知
+        event_hub.publish(user_id, "model.retrained", accuracy=accuracy)
+        logger.info(f"训练任务完成: user_id={user_id}, accuracy={accuracy:.2f}")
+
+# 创建全局训练调度器实例
+training_scheduler = TrainingScheduler()
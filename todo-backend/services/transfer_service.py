@@ -0,0 +1,152 @@
+import os
+import io
+import csv
+import json
+import enum
+import logging
+from datetime import datetime
+from typing import AsyncIterator, BinaryIO, Dict, Iterator, Optional, Tuple, Union
+from sqlalchemy import select
+from database.database import AsyncSessionLocal
+from models.todo import TodoModel
+
+logger = logging.getLogger(__name__)
+
+# 导出文件的列，导入时按同样的字段名读取（id 和 enrichment_status 导入时忽略）
+EXPORT_FIELDS = (
+    "id", "text", "completed", "category", "priority", "due_date", "created_at", "completed_at",
+    "estimated_hours", "actual_completion_time", "ai_generated_notes", "priority_reasoning",
+    "enrichment_status", "current_step", "steps",
+)
+# CSV 中以 JSON 字符串保存的列
+JSON_FIELDS = ("steps",)
+
+FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+class TodoTransferService:
+    """待办事项的流式导出和导入：导出使用服务端游标分批读取，导入逐行解析，内存占用与数据量无关"""
+
+    def __init__(self):
+        # 导出时每次从数据库游标读取的行数
+        self.export_batch_size = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+        # 导入时每个事务写入的行数
+        self.import_chunk_size = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+
+    async def export(self, user_id: int, fmt: str) -> AsyncIterator[str]:
+        """按创建时间顺序逐批生成导出内容
+
+        按 (created_at, id) 排序以便沿 ix_todos_user_created 索引读取，数据库不需要先排序全部结果。
+        使用独立的会话：StreamingResponse 在路由函数返回后才开始迭代，不能依赖请求的会话。
+        """
+        header = self.header(fmt)
+        if header:
+            yield header
+        columns = [getattr(TodoModel, name) for name in EXPORT_FIELDS]
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(
+                select(*columns)
+                .where(TodoModel.user_id == user_id)
+                .order_by(TodoModel.created_at, TodoModel.id)
+                .execution_options(yield_per=self.export_batch_size)
+            )
+            async for partition in result.partitions():
+                records = [
+                    {name: _export_value(value) for name, value in zip(EXPORT_FIELDS, row)}
+                    for row in partition
+                ]
+                yield self._csv(records) if fmt == "csv" else self._ndjson(records)
+
+    @staticmethod
+    def header(fmt: str) -> str:
+        """导出文件的开头：CSV 为带 BOM 的表头（Excel 打开时能正确识别 UTF-8 中文），NDJSON 没有"""
+        return "\ufeff" + ",".join(EXPORT_FIELDS) + "\r\n" if fmt == "csv" else ""
+
+    @staticmethod
+    def _ndjson(records) -> str:
+        return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+
+    @staticmethod
+    def _csv(records) -> str:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+        for record in records:
+            for name in JSON_FIELDS:
+                if record[name] is not None:
+                    record[name] = json.dumps(record[name], ensure_ascii=False)
+            writer.writerow(record)
+        return buffer.getvalue()
+
+    @staticmethod
+    def find_decode_error(file: BinaryIO) -> Optional[str]:
+        """检查上传的文件是否为 UTF-8 编码，返回第一处错误的说明，检查后回到文件开头
+
+        UTF-8 的多字节字符不含换行符，可以按行解码。
+        """
+        try:
+            for line_no, line in enumerate(file, 1):
+                try:
+                    line.decode("utf-8")
+                except UnicodeDecodeError:
+                    return f"第 {line_no} 行不是有效的 UTF-8 编码，请将文件另存为 UTF-8 后重新导入"
+            return None
+        finally:
+            file.seek(0)
+
+    def iter_records(self, file: BinaryIO, fmt: str) -> Iterator[Tuple[int, Union[Dict, str]]]:
+        """逐条解析上传的文件，生成 (行号, 记录) ；无法解析的行生成 (行号, 错误信息)
+
+        文件需要先通过 find_decode_error 检查编码。
+        """
+        text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="" if fmt == "csv" else None)
+        try:
+            if fmt == "csv":
+                yield from self._iter_csv(text)
+            else:
+                yield from self._iter_ndjson(text)
+        finally:
+            # 文件由 UploadFile 负责关闭
+            text.detach()
+
+    @staticmethod
+    def _iter_ndjson(text: io.TextIOWrapper) -> Iterator[Tuple[int, Union[Dict, str]]]:
+        for line_no, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_no, f"JSON 格式错误: {e}"
+                continue
+            yield line_no, record if isinstance(record, dict) else "每行应为一个 JSON 对象"
+
+    @staticmethod
+    def _iter_csv(text: io.TextIOWrapper) -> Iterator[Tuple[int, Union[Dict, str]]]:
+        reader = csv.DictReader(text)
+        try:
+            for row in reader:
+                # 空单元格视为未设置
+                record = {key: value for key, value in row.items() if key and value not in ("", None)}
+                try:
+                    for name in JSON_FIELDS:
+                        if name in record:
+                            record[name] = json.loads(record[name])
+                except ValueError as e:
+                    yield reader.line_num, f"{name} 列不是有效的 JSON: {e}"
+                    continue
+                yield reader.line_num, record
+        except csv.Error as e:
+            yield reader.line_num, f"CSV 格式错误: {e}"
+
+# 创建全局导入导出服务实例
+transfer_service = TodoTransferService()
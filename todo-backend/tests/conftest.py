@@ -0,0 +1,39 @@
+"""测试公共配置
+
+数据库和模型文件都使用相对路径，导入应用之前切换到临时目录；LLM 地址指向不可达的端口，
+测试不会访问外部服务。在 todo-backend 目录下运行：python -m pytest -q
+"""
+import os
+import sys
+import uuid
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.chdir(tempfile.mkdtemp(prefix="todo-tests-"))
+os.environ["DATABASE_URL"] = "sqlite:///./todos.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["OPENAI_API_KEY"] = "test"
+os.environ["OPENAI_API_BASE"] = "http://127.0.0.1:9/v1"
+os.environ["LLM_TIMEOUT"] = "2"
+# 测试中不需要真实的哈希成本
+os.environ["BCRYPT_ROUNDS"] = "4"
+
+import pytest
+from fastapi.testclient import TestClient
+
+@pytest.fixture(scope="session")
+def client():
+    import main
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def auth_headers(client):
+    """注册一个新用户，返回带访问令牌的请求头"""
+    username = f"user_{uuid.uuid4().hex[:12]}"
+    response = client.post("/auth/register", json={
+        "username": username, "email": f"{username}@example.com", "password": "password"
+    })
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
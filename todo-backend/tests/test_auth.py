@@ -0,0 +1,19 @@
+import uuid
+
+from auth.utils import GUEST_TOKEN_COOKIE, create_guest_token
+
+def test_concurrent_first_writes_of_guest_reuse_created_user(client):
+    # 两个请求都带着还没有 user_id 的游客令牌，相当于并发的第一次写入
+    token = create_guest_token(uuid.uuid4().hex)
+    client.cookies.clear()
+    headers = {"Cookie": f"{GUEST_TOKEN_COOKIE}={token}"}
+
+    first = client.post("/todos/bulk", json=[{"text": "游客任务一", "priority": "low"}], headers=headers)
+    second = client.post("/todos/bulk", json=[{"text": "游客任务二", "priority": "low"}], headers=headers)
+    client.cookies.clear()
+
+    assert first.status_code == 200, first.text
+    assert second.status_code == 200, second.text
+    # 两次写入属于同一个游客账户
+    listed = client.get("/todos/", headers={"Cookie": f"{GUEST_TOKEN_COOKIE}={second.cookies[GUEST_TOKEN_COOKIE]}"})
+    assert sorted(todo["text"] for todo in listed.json()) == ["游客任务一", "游客任务二"]
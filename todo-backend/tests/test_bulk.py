@@ -0,0 +1,27 @@
+import pytest
+
+@pytest.mark.parametrize("field", ["text", "completed", "category", "priority"])
+def test_bulk_update_rejects_null_for_required_fields(client, auth_headers, field):
+    todo_id = client.post("/todos/bulk", json=[{"text": "原始任务", "category": "工作", "priority": "low"}],
+                          headers=auth_headers).json()[0]["id"]
+
+    response = client.patch("/todos/bulk", json=[{"id": todo_id, field: None}], headers=auth_headers)
+    assert response.status_code == 422
+
+    todos = client.get("/todos/", headers=auth_headers)
+    assert todos.status_code == 200
+    assert [(todo["text"], todo["category"], todo["priority"], todo["completed"]) for todo in todos.json()] == [
+        ("原始任务", "工作", "low", False)
+    ]
+    assert client.get("/todos/changes", headers=auth_headers).status_code == 200
+
+def test_bulk_update_allows_null_for_optional_fields(client, auth_headers):
+    todo_id = client.post("/todos/bulk", json=[{"text": "有截止时间", "due_date": "2030-01-01T00:00:00"}],
+                          headers=auth_headers).json()[0]["id"]
+
+    response = client.patch("/todos/bulk", json=[{"id": todo_id, "due_date": None, "completed": True}],
+                            headers=auth_headers)
+    assert [item["status"] for item in response.json()] == ["updated"]
+    todo = client.get("/todos/", headers=auth_headers).json()[0]
+    assert todo["due_date"] is None
+    assert todo["completed"] is True
@@ -0,0 +1,149 @@
+import json
+import uuid
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from database.database import SessionLocal
+from models.enrichment import EnrichmentJob
+from models.todo import TodoModel
+from models.user import User
+from services.ai_service import ai_service
+from services.enrichment_service import EnrichmentWorker, enrichment_worker
+
+@pytest.fixture(autouse=True)
+def pause_background_worker(client, monkeypatch):
+    """测试直接调用 _process，不让应用中的后台队列领取测试任务
+
+    测试在新的事件循环中运行 _process，关闭批量合并，避免请求并入应用事件循环中等待的批次
+    """
+    monkeypatch.setattr(enrichment_worker, "_claim_jobs", lambda: [])
+    monkeypatch.setattr(ai_service.batcher, "max_items", 1)
+
+def _claimed_job(text: str) -> dict:
+    db = SessionLocal()
+    try:
+        name = f"enrich_{uuid.uuid4().hex[:12]}"
+        user = User(username=name, email=f"{name}@example.com")
+        db.add(user)
+        db.flush()
+        todo = TodoModel(text=text, user_id=user.id, enrichment_status="pending")
+        db.add(todo)
+        db.flush()
+        job = EnrichmentJob(todo_id=todo.id, status="running", claim_token="test", claimed_at=datetime.utcnow())
+        db.add(job)
+        db.commit()
+        return {
+            "job_id": job.id, "claim_token": "test", "todo_id": todo.id, "user_id": user.id, "text": text,
+            "due_date": None, "keep_category": False, "keep_priority": False,
+        }
+    finally:
+        db.close()
+
+def _load(job: dict):
+    db = SessionLocal()
+    try:
+        return db.get(EnrichmentJob, job["job_id"]), db.get(TodoModel, job["todo_id"])
+    finally:
+        db.close()
+
+def _reclaim(job: dict) -> None:
+    """模拟后台队列再次领取同一任务"""
+    db = SessionLocal()
+    try:
+        db.query(EnrichmentJob).filter(EnrichmentJob.id == job["job_id"]).update(
+            {"status": "running", "claim_token": job["claim_token"], "claimed_at": datetime.utcnow()}
+        )
+        db.commit()
+    finally:
+        db.close()
+
+def test_llm_failure_is_retried_then_marked_failed(monkeypatch):
+    async def unavailable(**kwargs):
+        raise RuntimeError("LLM unavailable")
+
+    monkeypatch.setattr(ai_service.client, "chat", unavailable)
+    worker = EnrichmentWorker()
+    worker.max_attempts = 2
+    job = _claimed_job(f"LLM 故障 {uuid.uuid4().hex}")
+
+    asyncio.run(worker._process(job))
+    db_job, todo = _load(job)
+    assert db_job.attempts == 1
+    assert db_job.status == "pending"
+    # 退避期间不会被再次领取
+    assert db_job.next_attempt_at >= datetime.utcnow() + timedelta(seconds=worker.retry_base_seconds - 5)
+    assert job["job_id"] not in [claimed["job_id"] for claimed in worker._claim_jobs()]
+    assert "LLM unavailable" in db_job.last_error
+    assert todo.enrichment_status == "pending"
+    assert todo.ai_generated_notes is None
+
+    _reclaim(job)
+    asyncio.run(worker._process(job))
+    db_job, todo = _load(job)
+    assert db_job is None
+    assert todo.enrichment_status == "failed"
+    assert todo.ai_generated_notes is None
+
+def test_llm_success_marks_done(monkeypatch):
+    async def answer(**kwargs):
+        return json.dumps({
+            "category": "工作", "priority": "high", "suggestions": "先列提纲",
+            "estimated_hours": 2, "reasoning": "有截止时间",
+        }, ensure_ascii=False)
+
+    monkeypatch.setattr(ai_service.client, "chat", answer)
+    job = _claimed_job(f"写周报 {uuid.uuid4().hex}")
+
+    asyncio.run(EnrichmentWorker()._process(job))
+    db_job, todo = _load(job)
+    assert db_job is None
+    assert todo.enrichment_status == "done"
+    assert todo.ai_generated_notes == "先列提纲"
+    assert todo.category == "工作"
+
+def test_deleted_todo_id_reused_by_other_user_is_not_enriched(monkeypatch):
+    job = _claimed_job(f"将被删除 {uuid.uuid4().hex}")
+
+    async def delete_then_answer(**kwargs):
+        # 调用LLM期间待办事项被删除，id 被另一个用户的新待办事项复用
+        db = SessionLocal()
+        try:
+            db.query(EnrichmentJob).filter(EnrichmentJob.todo_id == job["todo_id"]).delete()
+            db.query(TodoModel).filter(TodoModel.id == job["todo_id"]).delete()
+            other = User(username=f"other_{uuid.uuid4().hex[:12]}", email=f"{uuid.uuid4().hex[:12]}@example.com")
+            db.add(other)
+            db.flush()
+            db.add(TodoModel(id=job["todo_id"], text="别人的任务", user_id=other.id, category="生活"))
+            db.commit()
+        finally:
+            db.close()
+        return json.dumps({
+            "category": "工作", "priority": "high", "suggestions": "不应写入",
+            "estimated_hours": 2, "reasoning": "",
+        }, ensure_ascii=False)
+
+    monkeypatch.setattr(ai_service.client, "chat", delete_then_answer)
+    asyncio.run(EnrichmentWorker()._process(job))
+    _, todo = _load(job)
+    assert todo.text == "别人的任务"
+    assert todo.category == "生活"
+    assert todo.ai_generated_notes is None
+
+def test_delete_removes_pending_enrichment_job(client, auth_headers):
+    todo_id = client.post("/todos/bulk", json=[{"text": "待删除", "priority": "low"}],
+                          headers=auth_headers).json()[0]["id"]
+    db = SessionLocal()
+    try:
+        db.add(EnrichmentJob(todo_id=todo_id))
+        db.commit()
+    finally:
+        db.close()
+
+    assert client.delete(f"/todos/{todo_id}", headers=auth_headers).status_code == 200
+    db = SessionLocal()
+    try:
+        assert db.query(EnrichmentJob).filter(EnrichmentJob.todo_id == todo_id).count() == 0
+    finally:
+        db.close()
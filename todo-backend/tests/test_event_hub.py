@@ -0,0 +1,11 @@
+import pytest
+
+from services.event_hub import Broker, LocalBroker
+
+def test_broker_without_publish_cannot_be_created():
+    class IncompleteBroker(Broker):
+        pass
+
+    with pytest.raises(TypeError):
+        IncompleteBroker()
+    assert isinstance(LocalBroker(), Broker)
@@ -0,0 +1,24 @@
+import pytest
+
+def _import(client, auth_headers, filename, content):
+    return client.post("/todos/import", files={"file": (filename, content)}, headers=auth_headers)
+
+@pytest.mark.parametrize("filename, content", [
+    # Excel 默认以 GBK 保存中文 CSV
+    ("todos.csv", "text,priority\n第一条,low\n第二条,high\n".encode("gbk")),
+    ("todos.ndjson", '{"text": "有效的一行"}\n'.encode("utf-8") + '{"text": "第二行"}\n'.encode("gbk")),
+    ("todos.ndjson", b'{"text": "\xff\xfe"}\n'),
+])
+def test_import_rejects_non_utf8_file(client, auth_headers, filename, content):
+    response = _import(client, auth_headers, filename, content)
+    assert response.status_code == 400
+    assert "UTF-8" in response.json()["detail"]
+    # 有效的行也不会被导入
+    assert client.get("/todos/", headers=auth_headers).json() == []
+
+def test_import_accepts_utf8_with_bom(client, auth_headers):
+    content = "text,priority\n第一条,low\n第二条,high\n".encode("utf-8-sig")
+    response = _import(client, auth_headers, "todos.csv", content)
+    assert response.status_code == 200
+    assert response.json()["imported"] == 2
+    assert sorted(todo["text"] for todo in client.get("/todos/", headers=auth_headers).json()) == ["第一条", "第二条"]
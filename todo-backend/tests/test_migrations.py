@@ -0,0 +1,148 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database.database import Base
+from database.migrations import MIGRATIONS, run_migrations
+from models.todo import TodoModel
+from schemas.todo import Todo
+from services.response_cache import bump_data_version
+
+# 迁移系统引入之前 create_all 创建的表结构
+BASELINE_SCHEMA = [
+    """CREATE TABLE users (
+	id INTEGER NOT NULL,
+	username VARCHAR,
+	email VARCHAR,
+	hashed_password VARCHAR,
+	is_active BOOLEAN,
+	is_guest BOOLEAN,
+	created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+	last_login DATETIME,
+	PRIMARY KEY (id)
+)""",
+    "CREATE UNIQUE INDEX ix_users_username ON users (username)",
+    "CREATE UNIQUE INDEX ix_users_email ON users (email)",
+    "CREATE INDEX ix_users_id ON users (id)",
+    """CREATE TABLE todos (
+	id INTEGER NOT NULL,
+	text VARCHAR,
+	completed BOOLEAN,
+	user_id INTEGER,
+	category VARCHAR,
+	priority VARCHAR(6),
+	due_date DATETIME,
+	created_at DATETIME,
+	ai_generated_notes VARCHAR,
+	estimated_hours FLOAT,
+	priority_reasoning VARCHAR,
+	actual_completion_time FLOAT,
+	completed_at DATETIME,
+	steps JSON,
+	current_step INTEGER,
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+)""",
+    "CREATE INDEX ix_todos_category ON todos (category)",
+    "CREATE INDEX ix_todos_text ON todos (text)",
+    "CREATE INDEX ix_todos_id ON todos (id)",
+    "INSERT INTO users (id, username, email, is_active, is_guest) VALUES (1, 'old', 'old@example.com', 1, 0)",
+    "INSERT INTO todos (id, text, completed, user_id, category, priority, created_at) "
+    "VALUES (1, '旧任务', 0, 1, '工作', 'MEDIUM', '2024-01-01 00:00:00')",
+]
+
+def _old_database(tmp_path, *statements):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        for statement in [*BASELINE_SCHEMA, *statements]:
+            conn.execute(text(statement))
+    return engine
+
+def _column(conn, table, column):
+    """PRAGMA table_info 中的 (notnull, dflt_value)"""
+    for row in conn.execute(text(f"PRAGMA table_info({table})")):
+        if row[1] == column:
+            return row[3], row[4]
+    raise AssertionError(f"{table}.{column} 不存在")
+
+def test_baseline_database_gets_not_null_data_version(tmp_path):
+    engine = _old_database(tmp_path)
+
+    assert run_migrations(engine) == [version for version, _, _ in MIGRATIONS]
+    with engine.begin() as conn:
+        assert _column(conn, "users", "data_version") == (1, "0")
+        assert _column(conn, "todos", "revision") == (1, "0")
+        assert conn.execute(text("SELECT data_version FROM users WHERE id = 1")).scalar_one() == 0
+        assert conn.execute(bump_data_version(1)).scalar_one() == 1
+
+def test_null_data_version_added_by_old_baseline_is_backfilled(tmp_path):
+    # 旧的 baseline 迁移按模型补列时生成的列定义
+    engine = _old_database(tmp_path, "ALTER TABLE users ADD COLUMN data_version INTEGER")
+    with engine.begin() as conn:
+        assert conn.execute(text("SELECT data_version FROM users WHERE id = 1")).scalar_one() is None
+
+    run_migrations(engine)
+    with engine.begin() as conn:
+        assert _column(conn, "users", "data_version") == (1, "0")
+        assert conn.execute(bump_data_version(1)).scalar_one() == 1
+        # 重建表后索引仍然存在
+        indexes = {row[1] for row in conn.execute(text("PRAGMA index_list(users)"))}
+        assert {"ix_users_username", "ix_users_email"} <= indexes
+
+def test_null_revision_added_by_old_baseline_is_backfilled(tmp_path):
+    engine = _old_database(
+        tmp_path,
+        "ALTER TABLE users ADD COLUMN data_version INTEGER",
+        "ALTER TABLE todos ADD COLUMN enrichment_status VARCHAR",
+        "ALTER TABLE todos ADD COLUMN revision INTEGER",
+    )
+
+    run_migrations(engine)
+    with engine.begin() as conn:
+        assert _column(conn, "todos", "revision") == (1, "0")
+        with pytest.raises(IntegrityError):
+            with conn.begin_nested():
+                conn.execute(text("UPDATE todos SET revision = NULL WHERE id = 1"))
+
+    with Session(engine) as db:
+        todo = db.get(TodoModel, 1)
+        # 列表接口的响应模型要求 revision 为整数
+        assert Todo.model_validate(todo).revision == 0
+        db.add(TodoModel(text="迁移后新建", user_id=1, category="工作"))
+        db.commit()
+
+    with engine.begin() as conn:
+        # 重建表后全文索引和统计触发器仍然生效
+        matched = conn.execute(text("SELECT rowid FROM todos_fts WHERE todos_fts MATCH '迁移后新建'")).all()
+        assert len(matched) == 1
+        assert conn.execute(text("SELECT total_count FROM user_todo_stats WHERE user_id = 1")).scalar_one() == 2
+        indexes = {row[1] for row in conn.execute(text("PRAGMA index_list(todos)"))}
+        assert {"ix_todos_user_revision", "ix_todos_user_created"} <= indexes
+
+def _describe(engine):
+    """模型中每张表的列、索引、唯一约束、外键和主键"""
+    inspector = inspect(engine)
+    schema = {}
+    for table in Base.metadata.tables:
+        columns = {
+            # SQLite 中 DEFAULT 0 与 DEFAULT '0' 对整数列等价
+            col["name"]: (str(col["type"]), col["nullable"], (col["default"] or "").strip("'"))
+            for col in inspector.get_columns(table)
+        }
+        indexes = {idx["name"]: (idx["column_names"], bool(idx["unique"])) for idx in inspector.get_indexes(table)}
+        uniques = sorted(tuple(con["column_names"]) for con in inspector.get_unique_constraints(table))
+        foreign_keys = sorted(
+            (tuple(fk["constrained_columns"]), fk["referred_table"]) for fk in inspector.get_foreign_keys(table)
+        )
+        primary_key = inspector.get_pk_constraint(table)["constrained_columns"]
+        schema[table] = (columns, indexes, uniques, foreign_keys, primary_key)
+    return schema
+
+def test_migrated_database_matches_models(tmp_path):
+    migrated = create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+    run_migrations(migrated)
+    expected = create_engine(f"sqlite:///{tmp_path / 'models.db'}")
+    Base.metadata.create_all(bind=expected)
+
+    assert _describe(migrated) == _describe(expected)
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+
+from models.todo import PriorityEnum
+from services.ml_service import ModelBundle, TodoMLService, URGENT_KEYWORDS
+
+def _scalar_features(text, due_date, now):
+    """引入向量化之前逐条计算额外特征的实现，旧格式的模型按此训练"""
+    return [
+        1 if due_date else 0,
+        (due_date - now).days if due_date else 0,
+        len(text.split()),
+        1 if any(keyword in text.lower() for keyword in URGENT_KEYWORDS) else 0,
+    ]
+
+def test_additional_features_match_scalar_implementation():
+    now = datetime.utcnow()
+    texts = [
+        "a  b", "a\tb\nc", "  leading and trailing  ", "", "   ", "单个中文任务",
+        "中文 与 English mixed", "URGENT fix", "全角　空格", "x y", "马上 处理\r\n明天",
+    ]
+    due_dates = [
+        None, now + timedelta(days=3, hours=1), now - timedelta(days=2, hours=1), None, None,
+        now + timedelta(hours=5), None, now + timedelta(days=10, hours=2), None, None, now - timedelta(hours=1),
+    ]
+    service = TodoMLService(model_dir="ml_models_features", load=False)
+
+    vectorized = service._extract_additional_features(texts, due_dates)
+
+    expected = np.array([_scalar_features(t, d, now) for t, d in zip(texts, due_dates)], dtype=np.float64)
+    np.testing.assert_array_equal(vectorized, expected)
+
+class _Broken:
+    def transform(self, texts):
+        raise AssertionError("预测中途不应读取新的向量器")
+
+    def predict(self, features):
+        raise AssertionError("预测中途不应读取新的模型")
+
+def _training_todos(count):
+    priorities = [PriorityEnum.LOW, PriorityEnum.MEDIUM, PriorityEnum.HIGH]
+    texts = ["整理文档", "回复邮件", "紧急 修复线上故障"]
+    return [
+        SimpleNamespace(text=f"{texts[i % 3]} {i}", due_date=None, priority=priorities[i % 3])
+        for i in range(count)
+    ]
+
+def test_prediction_uses_one_bundle_during_hot_reload(tmp_path, monkeypatch):
+    trainer = TodoMLService(model_dir=str(tmp_path), load=False)
+    assert trainer.train_model(_training_todos(30)) is not None
+    service = TodoMLService(model_dir=str(tmp_path))
+    assert service.version == trainer.version
+    expected = service.predict_priority_batch(["紧急 修复线上故障 99", "整理文档 99"])
+
+    build_features = service.build_features
+
+    def build_then_reload(*args, **kwargs):
+        features = build_features(*args, **kwargs)
+        # 模拟另一个线程在特征计算完成后热加载了新版本
+        service.bundle = ModelBundle(model=_Broken(), vectorizer=_Broken())
+        return features
+
+    monkeypatch.setattr(service, "build_features", build_then_reload)
+    assert service.predict_priority_batch(["紧急 修复线上故障 99", "整理文档 99"]) == expected
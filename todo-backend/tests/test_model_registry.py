@@ -0,0 +1,52 @@
+import time
+import asyncio
+import threading
+
+from services.ml_service import TodoMLService
+from services.model_registry import ModelRegistry
+
+def test_get_async_loads_once_without_blocking_the_loop(tmp_path, monkeypatch):
+    registry = ModelRegistry(base_dir=str(tmp_path))
+    loaded = TodoMLService(model_dir=str(tmp_path / "7"), load=False)
+    calls = []
+
+    def slow_get(user_id):
+        calls.append(threading.current_thread())
+        time.sleep(0.2)
+        return loaded
+
+    monkeypatch.setattr(registry, "get", slow_get)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        results = await asyncio.gather(*(registry.get_async(7) for _ in range(5)))
+        task.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert calls[0] is not threading.main_thread()
+    assert all(result is loaded for result in results)
+    # 加载期间事件循环仍在运行
+    assert ticks >= 5
+    assert not registry._inflight
+
+def test_get_async_returns_loaded_model_without_thread(tmp_path, monkeypatch):
+    registry = ModelRegistry(base_dir=str(tmp_path))
+    service = TodoMLService(model_dir=str(tmp_path / "7"), load=False)
+    service._last_reload_check = time.monotonic()
+    registry._models[7] = (service, 0)
+
+    def unexpected(user_id):
+        raise AssertionError("已加载的模型不应再次加载")
+
+    monkeypatch.setattr(registry, "get", unexpected)
+    assert asyncio.run(registry.get_async(7)) is service
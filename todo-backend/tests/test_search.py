@@ -0,0 +1,58 @@
+import pytest
+
+from services.search_service import search_service
+
+@pytest.fixture
+def seeded(client, auth_headers):
+    todos = [
+        {"text": "制定学习计划", "category": "学习", "priority": "low"},
+        {"text": "计划周末旅行", "category": "生活", "priority": "low"},
+        {"text": "买菜", "category": "生活", "priority": "low"},
+        {"text": "Review PR", "category": "工作", "priority": "low"},
+        {"text": "整理房间", "category": "计划外", "priority": "low"},
+    ]
+    created = client.post("/todos/bulk", json=todos, headers=auth_headers).json()
+    return {todo["text"]: item["id"] for todo, item in zip(todos, created)}
+
+@pytest.fixture
+def no_like_fallback(monkeypatch):
+    async def unexpected(*args, **kwargs):
+        raise AssertionError("不应退回 LIKE 查询")
+
+    monkeypatch.setattr(search_service, "_search_like", unexpected)
+
+def _search(client, headers, q):
+    response = client.get("/todos/search", params={"q": q}, headers=headers)
+    assert response.status_code == 200, response.text
+    return [todo["text"] for todo in response.json()]
+
+def test_two_character_term_uses_index_and_ranks(client, auth_headers, seeded, no_like_fallback):
+    results = _search(client, auth_headers, "计划")
+    # 标题命中的排在只有分类命中的前面
+    assert set(results[:2]) == {"制定学习计划", "计划周末旅行"}
+    assert results[2:] == ["整理房间"]
+
+def test_short_term_at_end_of_text(client, auth_headers, seeded, no_like_fallback):
+    assert _search(client, auth_headers, "买菜") == ["买菜"]
+    assert _search(client, auth_headers, "菜") == ["买菜"]
+    assert _search(client, auth_headers, "pr") == ["Review PR"]
+
+def test_mixed_short_and_long_terms(client, auth_headers, seeded, no_like_fallback):
+    assert _search(client, auth_headers, "学习计划 制定") == ["制定学习计划"]
+    assert _search(client, auth_headers, "周末旅行 计划") == ["计划周末旅行"]
+    assert _search(client, auth_headers, "计划 房间") == ["整理房间"]
+
+def test_short_term_without_match(client, auth_headers, seeded, no_like_fallback):
+    assert _search(client, auth_headers, "划周末x") == []
+    assert _search(client, auth_headers, "旅计") == []
+
+def test_index_follows_updates(client, auth_headers, seeded, no_like_fallback):
+    todo_id = seeded["买菜"]
+    client.put(f"/todos/{todo_id}", json={"text": "买水果"}, headers=auth_headers)
+    assert _search(client, auth_headers, "买菜") == []
+    assert _search(client, auth_headers, "水果") == ["买水果"]
+    client.delete(f"/todos/{todo_id}", headers=auth_headers)
+    assert _search(client, auth_headers, "水果") == []
+
+def test_short_term_with_punctuation_falls_back_to_like(client, auth_headers, seeded):
+    assert _search(client, auth_headers, "w ") == ["Review PR"]
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+from database.database import SessionLocal
+from models.todo import TodoTombstone
+
+def _create(client, auth_headers, text):
+    return client.post("/todos/bulk", json=[{"text": text, "priority": "low"}], headers=auth_headers).json()[0]["id"]
+
+def _changes(client, auth_headers, since=None):
+    return client.get("/todos/changes", params={"since": since} if since else {}, headers=auth_headers)
+
+def test_cursor_older_than_pruned_tombstones_requires_resync(client, auth_headers):
+    first = _create(client, auth_headers, "第一条")
+    before_delete = _changes(client, auth_headers).json()["cursor"]
+    assert client.delete(f"/todos/{first}", headers=auth_headers).status_code == 200
+    response = _changes(client, auth_headers, before_delete)
+    assert response.json()["deleted"] == [first]
+    after_delete = response.json()["cursor"]
+
+    # 让第一条的删除记录超过保留期，下一次删除时被清理
+    db = SessionLocal()
+    try:
+        expired = datetime.utcnow() - timedelta(days=365)
+        db.query(TodoTombstone).filter(TodoTombstone.todo_id == first).update({"deleted_at": expired})
+        db.commit()
+    finally:
+        db.close()
+    second = _create(client, auth_headers, "第二条")
+    assert client.delete(f"/todos/{second}", headers=auth_headers).status_code == 200
+    db = SessionLocal()
+    try:
+        # SQLite 会复用已删除的id，按删除时间判断
+        assert db.query(TodoTombstone).filter(TodoTombstone.deleted_at <= expired).count() == 0
+    finally:
+        db.close()
+
+    assert _changes(client, auth_headers, before_delete).status_code == 410
+    response = client.post("/todos/sync", json={"since": before_delete, "todos": [
+        {"client_id": 1, "text": "不应上传", "priority": "low"}
+    ]}, headers=auth_headers)
+    assert response.status_code == 410
+    assert client.get("/todos/", headers=auth_headers).json() == []
+
+    # 清理之后的游标仍然可以增量同步
+    assert _changes(client, auth_headers, after_delete).json()["deleted"] == [second]
+    assert _changes(client, auth_headers).status_code == 200
@@ -0,0 +1,44 @@
+import uuid
+from datetime import datetime, timedelta
+
+from database.database import SessionLocal
+from models.todo import TodoModel, PriorityEnum
+from models.user import User
+from services.ml_service import TodoMLService
+from services.model_registry import model_registry
+from services.training_scheduler import TrainingScheduler, _train_user_model
+
+def _seed_completed_todos(count: int) -> int:
+    db = SessionLocal()
+    try:
+        name = f"train_{uuid.uuid4().hex[:12]}"
+        user = User(username=name, email=f"{name}@example.com")
+        db.add(user)
+        db.flush()
+        now = datetime.utcnow()
+        priorities = [PriorityEnum.LOW, PriorityEnum.MEDIUM, PriorityEnum.HIGH]
+        db.add_all(TodoModel(
+            text=f"{['整理文档', '回复邮件', '紧急 修复线上故障'][i % 3]} {i}",
+            user_id=user.id,
+            priority=priorities[i % 3],
+            due_date=now + timedelta(days=i % 7),
+            completed=True,
+            completed_at=now,
+        ) for i in range(count))
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+def test_training_runs_in_spawned_process(client):
+    """训练函数在 spawn 出的子进程中执行，子进程不会导入 main，所有模型必须由训练模块自己注册"""
+    user_id = _seed_completed_todos(30)
+    scheduler = TrainingScheduler()
+    try:
+        accuracy = scheduler._get_executor().submit(_train_user_model, user_id).result(timeout=300)
+    finally:
+        scheduler.shutdown()
+
+    assert accuracy is not None
+    service = TodoMLService(model_dir=model_registry.model_dir(user_id))
+    assert service.version is not None